@@ -1,16 +1,23 @@
+import argparse
 import tkinter as tk
 from tkinter import messagebox, ttk
 from flight_booking_backend import BookingManager
+from storage import create_storage
+from result_view import FLIGHT_COLUMNS, PASSENGER_COLUMNS, BackgroundSearch, PagedResults
 
 class FlightBookingGUI:
-    def __init__(self, root):
+    def __init__(self, root, backend="csv"):
         self.root = root
         self.root.title("Flight Booking System")
         self.root.geometry("1000x700")
         self.root.configure(bg="#f0f8ff")  # Light blue background
 
         # Initialize BookingManager with file paths
-        self.manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv")
+        self.manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv", storage=create_storage(backend))
+
+        # Searches run off the UI thread; the flight search and the schedule share one so the newest wins
+        self.flight_searches = BackgroundSearch(self.root)
+        self.passenger_searches = BackgroundSearch(self.root)
 
         self.create_widgets()
 
@@ -49,6 +56,7 @@ class FlightBookingGUI:
 
         self.flight_search_entry = tk.Entry(search_frame, font=("Arial", 12), width=30)
         self.flight_search_entry.pack(side=tk.LEFT, padx=10)
+        self.flight_search_entry.bind("<KeyRelease>", self.flight_query_changed)
 
         tk.Button(
             search_frame, text="Search", font=("Arial", 12), bg="#87cefa", fg="white", command=self.search_flights
@@ -59,8 +67,8 @@ class FlightBookingGUI:
         ).pack(side=tk.LEFT, padx=10)
 
         # Flight results area
-        self.flight_results = tk.Text(flight_tab, font=("Courier", 10), bg="#f5f5f5", height=20, wrap="word")
-        self.flight_results.pack(pady=10, padx=10, fill="both")
+        self.flight_results = PagedResults(flight_tab, FLIGHT_COLUMNS, bg="#f0f8ff")
+        self.flight_results.pack(pady=10, padx=10, fill="both", expand=True)
 
     def create_passenger_tab(self):
         passenger_tab = ttk.Frame(self.notebook)
@@ -77,14 +85,15 @@ class FlightBookingGUI:
 
         self.passenger_search_entry = tk.Entry(search_frame, font=("Arial", 12), width=30)
         self.passenger_search_entry.pack(side=tk.LEFT, padx=10)
+        self.passenger_search_entry.bind("<KeyRelease>", self.passenger_query_changed)
 
         tk.Button(
             search_frame, text="Search", font=("Arial", 12), bg="#87cefa", fg="white", command=self.search_passengers
         ).pack(side=tk.LEFT, padx=10)
 
         # Passenger details area
-        self.passenger_details = tk.Text(passenger_tab, font=("Courier", 10), bg="#f5f5f5", height=20, wrap="word")
-        self.passenger_details.pack(pady=10, padx=10, fill="both")
+        self.passenger_details = PagedResults(passenger_tab, PASSENGER_COLUMNS, bg="#f0f8ff")
+        self.passenger_details.pack(pady=10, padx=10, fill="both", expand=True)
 
     def create_booking_tab(self):
         booking_tab = ttk.Frame(self.notebook)
@@ -120,34 +129,31 @@ class FlightBookingGUI:
         self.booking_results = tk.Text(booking_tab, font=("Courier", 10), bg="#f5f5f5", height=15, wrap="word")
         self.booking_results.pack(pady=10, padx=10, fill="both")
 
-    def search_flights(self):
+    def flight_search(self):
         query = self.flight_search_entry.get()
-        results = self.manager.search_flight(query)
-        self.flight_results.delete(1.0, tk.END)
-        if results:
-            for result in results:
-                self.flight_results.insert(tk.END, f"Flight ID: {result[0]}, Departure: {result[1]}, Arrival: {result[2]}, Date: {result[3]}, Time: {result[4]}, Seats Available: {result[5]}\n")
-        else:
-            self.flight_results.insert(tk.END, "No flights found matching the query.\n")
+        return (lambda: self.manager.search_flight(query),
+                lambda results: self.flight_results.show(results, "No flights found matching the query."))
+
+    def search_flights(self):
+        self.flight_searches.submit(*self.flight_search())
+
+    def flight_query_changed(self, event):
+        self.flight_searches.debounce(*self.flight_search())
 
     def view_schedule(self):
-        results = self.manager.view_schedule()
-        self.flight_results.delete(1.0, tk.END)
-        if results:
-            for result in results:
-                self.flight_results.insert(tk.END, f"Flight ID: {result[0]}, Departure: {result[1]}, Arrival: {result[2]}, Date: {result[3]}, Time: {result[4]}, Seats Available: {result[5]}\n")
-        else:
-            self.flight_results.insert(tk.END, "No flights available in the schedule.\n")
+        self.flight_searches.submit(self.manager.view_schedule,
+                                    lambda results: self.flight_results.show(results, "No flights available in the schedule."))
 
-    def search_passengers(self):
+    def passenger_search(self):
         query = self.passenger_search_entry.get()
-        results = self.manager.search_passenger(query)
-        self.passenger_details.delete(1.0, tk.END)
-        if results:
-            for result in results:
-                self.passenger_details.insert(tk.END, f"Passenger ID: {result[0]}, Name: {result[1]}, Contact: {result[2]}, Booked Flights: {result[3]}\n")
-        else:
-            self.passenger_details.insert(tk.END, "No passengers found matching the query.\n")
+        return (lambda: self.manager.search_passenger(query),
+                lambda results: self.passenger_details.show(results, "No passengers found matching the query."))
+
+    def search_passengers(self):
+        self.passenger_searches.submit(*self.passenger_search())
+
+    def passenger_query_changed(self, event):
+        self.passenger_searches.debounce(*self.passenger_search())
 
     def book_flight(self):
         flight_id = self.flight_id_entry.get()
@@ -164,6 +170,10 @@ class FlightBookingGUI:
         self.booking_results.insert(tk.END, message + "\n")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flight Booking System")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = FlightBookingGUI(root)
+    app = FlightBookingGUI(root, args.backend)
     root.mainloop()
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from flight_booking_backend import BookingManager
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class BookingServer:
+    def __init__(self, manager, workers=32):
+        self.manager = manager
+        # Bookings do file I/O, so they run on threads instead of blocking the event loop
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def handle(self, reader, writer):
+        # Pipelined requests on one connection are read and answered in order
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except Exception as error:
+                    # Answer instead of dropping the connection and the requests pipelined behind this one
+                    status, payload = 500, {"error": f"{type(error).__name__}: {error}"}
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        loop = asyncio.get_running_loop()
+
+        if url.path in ("/book", "/cancel"):
+            if method != "POST":
+                return 405, {"error": "Use POST."}
+            try:
+                request = json.loads(body or b"{}")
+                flight_id, passenger_id = request["flight_id"], request["passenger_id"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": "Expected a JSON body with flight_id and passenger_id."}
+            action = self.manager.book_flight if url.path == "/book" else self.manager.cancel_booking
+            message = await loop.run_in_executor(self.executor, action, flight_id, passenger_id)
+            return 200, {"message": message}
+
+        if method != "GET":
+            return 405, {"error": "Use GET."}
+        if url.path == "/flights":
+            return 200, {"results": self.manager.search_flight(params.get("q", ""))}
+        if url.path == "/passengers":
+            return 200, {"results": self.manager.search_passenger(params.get("q", ""))}
+        if url.path == "/manifest":
+            return 200, {"results": self.manager.get_manifest(params.get("flight_id", ""))}
+        if url.path == "/schedule":
+            if not params:
+                return 200, {"results": self.manager.view_schedule()}
+            try:
+                min_seats = int(params.get("min_seats", 0))
+            except ValueError:
+                return 400, {"error": "min_seats must be an integer."}
+            try:
+                results = self.manager.find_flights(params.get("departure"), params.get("arrival"),
+                                                    params.get("start_date"), params.get("end_date"), min_seats)
+            except ValueError:
+                return 400, {"error": "start_date and end_date must be YYYY-MM-DD."}
+            return 200, {"results": results}
+        if url.path == "/metrics":
+            snapshot = self.manager.metrics_snapshot()
+            if snapshot is None:
+                return 404, {"error": "Metrics are off; start the server with --metrics-file."}
+            return 200, snapshot
+        if url.path == "/cache":
+            return 200, self.manager.cache_stats()
+        if url.path == "/departures":
+            try:
+                results = self.manager.next_departures(params["after"], int(params.get("count", 10)),
+                                                       params.get("departure"), params.get("arrival"))
+            except (KeyError, ValueError):
+                return 400, {"error": "Expected after=YYYY-MM-DD[ HH:MM] and an integer count."}
+            return 200, {"results": results}
+        return 404, {"error": f"Unknown path {url.path}."}
+
+async def serve(manager, host, port):
+    server = BookingServer(manager)
+    port = await server.start(host, port)
+    print(f"Serving bookings on http://{host}:{port}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve BookingManager over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--journal", default="",
+                        help="journal file, folded into the CSVs on shutdown; none by default")
+    parser.add_argument("--group-commit", action="store_true")
+    parser.add_argument("--metrics-file", help="turn on metrics and rewrite this Prometheus text file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=15.0)
+    args = parser.parse_args()
+
+    manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv",
+                             journal_file=args.journal or None, group_commit=args.group_commit)
+    if args.metrics_file:
+        manager.enable_metrics(dump_file=args.metrics_file, dump_interval=args.metrics_interval)
+    try:
+        asyncio.run(serve(manager, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Fold any journal into the CSVs so the GUI and main.py see the bookings made here
+        manager.compact()
+        manager.close()
@@ -1,102 +1,637 @@
 import csv
 import os
+import sys
+import threading
+import time
+from itertools import islice
+from journal import Journal
+from group_commit import GroupCommitter
+from search_index import NGramIndex
+from schedule_index import UNSCHEDULED, ScheduleIndex, departure_timestamp, parse_moment
+from locking import LockTable
+from snapshot import LazyRecords, Snapshot, write_snapshot
+from ledger import BookingLedger
+from itinerary import RouteGraph
+from storage import CsvStorage
+from metrics import Metrics
+from result_cache import ResultCache
+from update_log import UpdateLog
+
+FLIGHT_HEADER = ["Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available"]
+PASSENGER_HEADER = ["Passenger ID", "Name", "Contact Details", "Booked Flights"]
+
+def read_csv_chunks(path, chunk_size=10000):
+    # Stream the data rows of a CSV file, header skipped, in lists of at most chunk_size rows
+    with open(path, mode='r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+def write_temp_csv(path, header, rows):
+    # Write and fsync path + ".tmp"; BookingManager.commit_files renames it into place
+    temp_path = path + ".tmp"
+    with open(temp_path, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    return temp_path
 
 class Flight:
+    # No per-instance __dict__; repeated strings (cities, dates, times) are interned
+    __slots__ = ("flight_id", "departure", "arrival", "date", "time", "seats_available", "departs_at")
+
     def __init__(self, flight_id, departure, arrival, date, time, seats_available):
-        self.flight_id = flight_id
-        self.departure = departure
-        self.arrival = arrival
-        self.date = date
-        self.time = time
+        self.flight_id = sys.intern(flight_id)
+        self.departure = sys.intern(departure)
+        self.arrival = sys.intern(arrival)
+        self.date = sys.intern(date)
+        self.time = sys.intern(time)
         self.seats_available = int(seats_available)
+        # Epoch seconds, so flights sort and compare chronologically without re-parsing
+        self.departs_at = departure_timestamp(date, time)
 
     def to_csv_format(self):
         return [self.flight_id, self.departure, self.arrival, self.date, self.time, self.seats_available]
 
+    def search_text(self):
+        return self.flight_id + self.departure + self.arrival
+
 class Passenger:
+    __slots__ = ("passenger_id", "name", "contact_details", "booked_flights")
+
     def __init__(self, passenger_id, name, contact_details, booked_flights=None):
         self.passenger_id = passenger_id
         self.name = name
         self.contact_details = contact_details
-        self.booked_flights = booked_flights if booked_flights else []
+        # A dict is an ordered set: O(1) membership, add and remove, and CSV order is kept.
+        # Booked flight IDs share the interned strings held by the Flight objects.
+        self.booked_flights = dict.fromkeys(sys.intern(flight_id) for flight_id in booked_flights or () if flight_id)
 
     def add_flight(self, flight_id):
-        if flight_id not in self.booked_flights:
-            self.booked_flights.append(flight_id)
+        self.booked_flights[flight_id] = None
 
     def remove_flight(self, flight_id):
-        if flight_id in self.booked_flights:
-            self.booked_flights.remove(flight_id)
+        self.booked_flights.pop(flight_id, None)
 
     def to_csv_format(self):
         return [self.passenger_id, self.name, self.contact_details, ",".join(self.booked_flights)]
 
+    def search_text(self):
+        return self.passenger_id + self.name + self.contact_details
+
 class BookingManager:
-    def __init__(self, flights_file, passengers_file, bookings_file):
+    def __init__(self, flights_file, passengers_file, bookings_file, journal_file=None, compact_threshold=10000,
+                 group_commit=False, commit_window=0.005, commit_batch_size=64,
+                 bookings_history="full", chunk_size=10000, progress=None, snapshot_file=None,
+                 ledger_dir=None, ledger_segment_rows=100000, storage=None, metrics=None,
+                 cache_size=256, update_log=None):
         self.flights_file = flights_file
         self.passengers_file = passengers_file
         self.bookings_file = bookings_file
-        self.update_log_file = "updateLog.csv"
+        # Changed records are appended to these sidecars and merged on load; compact() folds each
+        # back into its CSV once it holds as many rows as the table, so rewrites stay amortized O(1)
+        self.flights_delta_file = flights_file + ".delta"
+        self.passengers_delta_file = passengers_file + ".delta"
+        self.flight_delta_rows = 0
+        self.passenger_delta_rows = 0
+        # Commit marker: the committed size of every append-only file, plus renames still to do.
+        # Anything past those sizes on startup is from a save that never committed.
+        self.commit_file = bookings_file + ".commit"
+        self.recovered = False
+        # Audit trail of bookings and cancellations; pass an UpdateLog to set durability and rotation
+        self.update_log = update_log or UpdateLog("updateLog.csv")
+        # Where records are loaded from and saved to; see storage.py
+        self.storage = storage or CsvStorage()
+        # With a journal each mutation appends one record instead of rewriting the CSVs
+        self.journal = Journal(journal_file) if journal_file else None
+        self.compact_threshold = compact_threshold
+        # Per-flight and per-passenger locks, so bookings on different flights run in parallel
+        self.locks = LockTable()
+        # Serializes writes to the journal, snapshot CSVs and update log
+        self.io_lock = threading.Lock()
+        # "full" keeps every bookings.csv row in self.bookings, "aggregate" keeps only
+        # per-flight counts and "lazy" reads nothing until iter_bookings() is called
+        self.bookings_history = bookings_history
+        self.chunk_size = chunk_size
+        # progress(file_name, rows_loaded) is called after every chunk
+        self.progress = progress
+        # A binary snapshot newer than the CSVs is memory-mapped instead of parsing them
+        self.snapshot_file = snapshot_file
+        self.snapshot = None
+        # A segmented ledger replaces bookings.csv and keeps no history in memory
+        if ledger_dir and not isinstance(self.storage, CsvStorage):
+            raise ValueError("ledger_dir only works with CSV storage; other backends keep their own booking history.")
+        self.ledger = BookingLedger(ledger_dir, ledger_segment_rows) if ledger_dir else None
         self.flights = {}
         self.passengers = {}
         self.bookings = []
+        # Rows of self.bookings already appended to bookings.csv
+        self.bookings_saved = 0
+        # flight_id -> [bookings, cancellations], unless bookings_history is "lazy"
+        self.booking_counts = None
+        # flight_id -> ordered set of passenger IDs booked on it
+        self.manifests = {}
+        self.flight_index = NGramIndex()
+        self.passenger_index = NGramIndex()
+        self.schedule_index = ScheduleIndex()
+        self.indexes_ready = False
+        # Built on the first itinerary search and dropped whenever the schedule changes
+        self.route_graph = None
+        # Cached itineraries, cleared on schedule changes and when a flight sells out or reopens
+        self.itineraries = {}
+        # Recent view_schedule / search results; bookings bump the version of the flight and passenger
+        # they touch and the stale rows are rebuilt on the next hit. See result_cache.py.
+        self.flight_results = ResultCache(cache_size)
+        self.passenger_results = ResultCache(cache_size)
+        load_started = time.perf_counter()
         self.load_data()
+        # In group-commit mode mutations made within one window share a single flush
+        self.committer = GroupCommitter(self.flush_changes, commit_window, commit_batch_size) if group_commit else None
+        # Off unless a Metrics object is passed here or to enable_metrics(); see metrics.py
+        self.metrics = None
+        if metrics:
+            self.enable_metrics(metrics)
+            metrics.observe("load_data", time.perf_counter() - load_started)
 
     def load_data(self):
+        self.bookings = []
+        self.booking_counts = None if self.bookings_history == "lazy" or self.ledger else {}
+        self.storage.load(self)
+        self.bookings_saved = len(self.bookings)
+
+        # Replay mutations made since the last snapshot
+        if self.journal:
+            self.replay_journal()
+
+        # With a snapshot, records stay undecoded until a query first needs the indexes
+        if self.snapshot is None:
+            self.build_indexes()
+
+        # The commit marker makes saves all-or-nothing, so the files can only disagree after a recovery.
+        # Other writers of these CSVs (main.py) do not log to the history, so it is not trusted otherwise.
+        if self.recovered:
+            self.repair_bookings()
+
+    def load_files(self):
+        self.recovered = self.recover_files()
+        if self.snapshot_is_current():
+            self.load_snapshot()
+        else:
+            self.load_csv_records()
+
+        # Load bookings
+        if self.ledger:
+            self.ledger.load()
+        elif self.bookings_history != "lazy":
+            try:
+                loaded = 0
+                for chunk in read_csv_chunks(self.bookings_file, self.chunk_size):
+                    for row in chunk:
+                        self.count_booking(row)
+                    if self.bookings_history == "full":
+                        self.bookings.extend(chunk)
+                    loaded += len(chunk)
+                    self.report_progress(self.bookings_file, loaded)
+            except FileNotFoundError:
+                print("Bookings file not found. Starting fresh.")
+        # Rewritten only once the ledger knows its active segment
+        if self.recovered or not os.path.exists(self.commit_file):
+            self.commit_files()
+
+    def load_csv_records(self):
         # Load flights
         try:
-            with open(self.flights_file, mode='r') as f:
-                reader = csv.reader(f)
-                next(reader)  # Skip header
-                for row in reader:
+            loaded = 0
+            for chunk in read_csv_chunks(self.flights_file, self.chunk_size):
+                for row in chunk:
                     flight = Flight(row[0], row[1], row[2], row[3], row[4], row[5])
                     self.flights[flight.flight_id] = flight
+                loaded += len(chunk)
+                self.report_progress(self.flights_file, loaded)
         except FileNotFoundError:
             print("Flights file not found. Starting fresh.")
 
         # Load passengers
         try:
-            with open(self.passengers_file, mode='r') as f:
-                reader = csv.reader(f)
-                next(reader)  # Skip header
-                for row in reader:
+            loaded = 0
+            for chunk in read_csv_chunks(self.passengers_file, self.chunk_size):
+                for row in chunk:
                     booked_flights = row[3].split(',') if isinstance(row[3], str) and row[3] else []
                     passenger = Passenger(row[0], row[1], row[2], booked_flights)
                     self.passengers[passenger.passenger_id] = passenger
+                loaded += len(chunk)
+                self.report_progress(self.passengers_file, loaded)
         except FileNotFoundError:
             print("Passengers file not found. Starting fresh.")
 
-        # Load bookings
+        self.load_deltas()
+
+    def load_deltas(self):
+        # Later rows for a record replace earlier ones and the record keeps its place in the table
+        self.flight_delta_rows = self.passenger_delta_rows = 0
+        try:
+            for chunk in read_csv_chunks(self.flights_delta_file, self.chunk_size):
+                for row in chunk:
+                    flight = Flight(row[0], row[1], row[2], row[3], row[4], row[5])
+                    self.flights[flight.flight_id] = flight
+                self.flight_delta_rows += len(chunk)
+        except FileNotFoundError:
+            pass
+        try:
+            for chunk in read_csv_chunks(self.passengers_delta_file, self.chunk_size):
+                for row in chunk:
+                    booked_flights = row[3].split(',') if row[3] else []
+                    passenger = Passenger(row[0], row[1], row[2], booked_flights)
+                    self.passengers[passenger.passenger_id] = passenger
+                self.passenger_delta_rows += len(chunk)
+        except FileNotFoundError:
+            pass
+
+    def recover_files(self):
+        # Finish renames of an interrupted commit and cut off writes made after the last commit
         try:
-            with open(self.bookings_file, mode='r') as f:
-                reader = csv.reader(f)
-                next(reader)  # Skip header
-                self.bookings = list(reader)
+            with open(self.commit_file, mode='r', newline='') as f:
+                marker = [row for row in csv.reader(f) if len(row) == 3]
         except FileNotFoundError:
-            print("Bookings file not found. Starting fresh.")
+            marker = None
+        recovered = False
+        for kind, path, target in marker or ():
+            if kind == "rename" and os.path.exists(path):
+                os.replace(path, target)
+                recovered = True
+        for kind, path, size in marker or ():
+            if kind == "size" and os.path.exists(path) and os.path.getsize(path) > int(size):
+                if int(size) == 0:
+                    os.remove(path)
+                else:
+                    with open(path, mode='r+b') as f:
+                        f.truncate(int(size))
+                recovered = True
+        # A temp file the marker does not name belongs to a commit that never started
+        for path in (self.flights_file, self.passengers_file):
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+        if recovered:
+            print("Recovered from an interrupted save.")
+        return recovered
+
+    def repair_bookings(self):
+        # Every live booking in the history must show on its passenger and in its flight's seats.
+        # Seats and passengers are always committed together, so a booking missing from both is
+        # re-applied; the seat count is never guessed from anything else.
+        live = {}
+        if self.ledger:
+            live = self.ledger.current
+        else:
+            for row in self.booking_history():
+                if row[0] == "BOOK":
+                    live[(row[1], row[2])] = None
+                elif row[0] == "CANCEL":
+                    live.pop((row[1], row[2]), None)
+        flights, passengers = {}, {}
+        for flight_id, passenger_id in list(live):
+            flight = self.flights.get(flight_id)
+            passenger = self.passengers.get(passenger_id)
+            if flight and passenger and flight_id not in passenger.booked_flights:
+                flight.seats_available -= 1
+                passenger.add_flight(flight_id)
+                if self.indexes_ready:
+                    self.manifests.setdefault(flight_id, {})[passenger_id] = None
+                flights[flight_id] = flight
+                passengers[passenger_id] = passenger
+        if flights:
+            print(f"Repaired {len(passengers)} passengers and {len(flights)} flights from the booking history.")
+            with self.io_lock:
+                self.save_flight_changes([flight.to_csv_format() for flight in flights.values()])
+                self.save_passenger_changes([passenger.to_csv_format() for passenger in passengers.values()])
+                self.commit_files()
+        return len(flights)
+
+    def snapshot_is_current(self):
+        # Deltas are applied on top of the snapshot, so only the full CSVs can make it stale
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return False
+        snapshot_time = os.path.getmtime(self.snapshot_file)
+        for path in (self.flights_file, self.passengers_file):
+            if os.path.exists(path) and os.path.getmtime(path) > snapshot_time:
+                return False
+        return True
+
+    def load_snapshot(self):
+        snapshot = self.snapshot = Snapshot(self.snapshot_file)
+        self.flights = LazyRecords(snapshot.flight_count, snapshot.flight_id,
+                                   lambda slot: Flight(*snapshot.flight_row(slot)))
+        self.passengers = LazyRecords(snapshot.passenger_count, snapshot.passenger_id,
+                                      lambda slot: self.decode_passenger(snapshot.passenger_row(slot)))
+        self.load_deltas()
+
+    def decode_passenger(self, row):
+        booked_flights = row[3].split(',') if row[3] else []
+        return Passenger(row[0], row[1], row[2], booked_flights)
+
+    def save_snapshot(self):
+        write_snapshot(self.snapshot_file, (flight.to_csv_format() for flight in self.flights.values()),
+                       (passenger.to_csv_format() for passenger in self.passengers.values()))
+
+    def ensure_indexes(self):
+        # Must not be called with any booking locks held
+        if not self.indexes_ready:
+            with self.locks.exclusive():
+                if not self.indexes_ready:
+                    self.build_indexes()
+
+    def build_indexes(self):
+        # Build the search indexes once; add_flight/add_passenger keep them current
+        self.flight_index = NGramIndex()
+        for flight in self.flights.values():
+            self.flight_index.add(flight.flight_id, flight.search_text())
+        self.passenger_index = NGramIndex()
+        for passenger in self.passengers.values():
+            self.passenger_index.add(passenger.passenger_id, passenger.search_text())
+        self.schedule_index = ScheduleIndex()
+        for flight in self.flights.values():
+            self.schedule_index.add(flight)
+            if flight.departs_at == UNSCHEDULED:
+                print(f"Flight {flight.flight_id} has an unreadable date or time "
+                      f"({flight.date!r}, {flight.time!r}); it is listed last in the schedule.")
+        self.manifests = {}
+        for passenger in self.passengers.values():
+            self.add_to_manifests(passenger)
+        self.indexes_ready = True
+
+    def report_progress(self, file_name, rows_loaded):
+        if self.progress:
+            self.progress(file_name, rows_loaded)
+
+    def count_booking(self, row):
+        if self.booking_counts is not None:
+            counts = self.booking_counts.setdefault(row[1], [0, 0])
+            counts[0 if row[0] == "BOOK" else 1] += 1
+
+    def add_booking_row(self, row):
+        # Callers hold io_lock (or are still loading), which also guards the counts
+        self.bookings.append(row)
+        self.count_booking(row)
+
+    def iter_bookings(self):
+        # Stream the whole booking history without holding it in memory
+        return self.booking_history()
+
+    def booking_history(self, start_date=None, end_date=None, flight_id=None, passenger_id=None):
+        # Dates are inclusive "YYYY-MM-DD" strings; storage may skip segments or use indexes for the filters
+        if self.bookings_history == "full" and not self.ledger:
+            rows = list(self.bookings)
+        else:
+            saved = self.bookings_saved
+            yield from self.storage.iter_bookings(self, start_date, end_date, flight_id, passenger_id)
+            rows = self.bookings[saved:]
+        for row in rows:
+            if start_date and row[3] < start_date or end_date and row[3] > end_date:
+                continue
+            if flight_id and row[1] != flight_id or passenger_id and row[2] != passenger_id:
+                continue
+            yield row
+
+    def read_booking_files(self, start_date=None, end_date=None, flight_id=None, passenger_id=None):
+        if self.ledger:
+            yield from self.ledger.history(start_date, end_date, flight_id, passenger_id)
+            return
+        try:
+            for chunk in read_csv_chunks(self.bookings_file, self.chunk_size):
+                yield from chunk
+        except FileNotFoundError:
+            pass
+
+    def current_bookings(self, flight_id=None):
+        # [flight_id, passenger_id, date] for every booking that has not been cancelled
+        if self.ledger and not self.journal:
+            return self.ledger.current_bookings(flight_id)
+        self.ensure_indexes()
+        flight_ids = [flight_id] if flight_id else list(self.manifests)
+        return [[booked_flight, passenger_id, self.flights[booked_flight].date]
+                for booked_flight in flight_ids if booked_flight in self.flights
+                for passenger_id in self.manifests.get(booked_flight, ())]
+
+    def add_to_manifests(self, passenger):
+        for flight_id in passenger.booked_flights:
+            self.manifests.setdefault(flight_id, {})[passenger.passenger_id] = None
+
+    def replay_journal(self):
+        # Replay is idempotent so a crash between snapshot and journal reset is harmless
+        for row in self.journal.replay():
+            transaction_type, flight_id, passenger_id = row[0], row[1], row[2]
+            flight = self.flights.get(flight_id)
+            passenger = self.passengers.get(passenger_id)
+            if not flight or not passenger:
+                continue
+            if transaction_type == "BOOK" and flight_id not in passenger.booked_flights:
+                self.add_booking_row(self.apply_booking(flight, passenger))
+            elif transaction_type == "CANCEL" and flight_id in passenger.booked_flights:
+                self.add_booking_row(self.apply_cancellation(flight, passenger))
+
+    def save_changes(self, rows, flights, passengers):
+        # Persist the booking rows of one or more mutations with their flights and passengers as of those
+        # rows. The rows join self.bookings here, so the history in memory is in the order it is saved.
+        with self.io_lock:
+            for row in rows:
+                self.add_booking_row(row)
+            self.storage.save_changes(self, rows, flights, passengers)
+
+    def save_files(self, rows, flights, passengers):
+        if self.journal:
+            self.journal.append(rows)
+        else:
+            # One commit covers exactly these rows and the records they changed
+            self.save_bookings()
+            self.save_flight_changes(flights)
+            self.save_passenger_changes(passengers)
+            self.commit_files()
+
+    def flush_changes(self, changes):
+        # changes are (rows, flight rows, passenger rows) in the order they were recorded; for a record
+        # changed more than once the latest row wins
+        rows, flights, passengers = [], {}, {}
+        for change_rows, flight_rows, passenger_rows in changes:
+            rows.extend(change_rows)
+            flights.update((row[0], row) for row in flight_rows)
+            passengers.update((row[0], row) for row in passenger_rows)
+        self.save_changes(rows, list(flights.values()), list(passengers.values()))
+        with self.io_lock:
+            self.log_updates(rows)
+
+    def record_changes(self, rows):
+        # Called with the flight and passenger locks held so rows for them reach storage in order. The
+        # records are captured here: in group-commit mode later bookings may have changed them again by
+        # the time this change is flushed, and those must not be saved before their own rows.
+        flights = [self.flights[flight_id].to_csv_format() for flight_id in dict.fromkeys(row[1] for row in rows)]
+        passengers = [self.passengers[passenger_id].to_csv_format()
+                      for passenger_id in dict.fromkeys(row[2] for row in rows)]
+        if self.committer:
+            return self.committer.submit([(rows, flights, passengers)])
+        self.flush_changes([(rows, flights, passengers)])
+        return None
+
+    def finish_change(self, batch):
+        # Called after the locks are released
+        if batch is not None:
+            self.committer.wait(batch)
+        if self.compaction_due():
+            self.compact(only_if_due=True)
+
+    def compaction_due(self):
+        if self.journal:
+            return self.journal.count >= self.compact_threshold
+        # Deltas are folded once they hold as many rows as their table
+        return (self.flight_delta_rows >= max(len(self.flights), 1)
+                or self.passenger_delta_rows >= max(len(self.passengers), 1))
+
+    def enable_metrics(self, metrics=None, dump_file=None, dump_interval=15.0):
+        # Start timing operations and persistence steps; returns the Metrics object
+        self.disable_metrics()
+        self.metrics = metrics or Metrics()
+        self.metrics.instrument(self)
+        if dump_file:
+            self.metrics.start_dumps(dump_file, dump_interval)
+        return self.metrics
+
+    def disable_metrics(self):
+        if self.metrics:
+            self.metrics.stop_dumps()
+            self.metrics.uninstrument()
+            self.metrics = None
+
+    def metrics_snapshot(self):
+        return self.metrics.snapshot() if self.metrics else None
+
+    def close(self):
+        self.disable_metrics()
+        if self.committer:
+            self.committer.close()
+        if self.journal:
+            self.journal.close()
+        if self.snapshot:
+            self.snapshot.close()
+        if self.ledger:
+            self.ledger.close()
+        self.update_log.close()
+        self.storage.close()
+
+    def compact(self, only_if_due=False):
+        # Write fresh CSVs, folding in the deltas, and start an empty journal, with no booking in progress
+        with self.locks.exclusive():
+            # Changes already applied but still queued must be saved first, or the fresh CSVs would hold
+            # records ahead of the history. The committer only needs io_lock, so this cannot deadlock.
+            if self.committer:
+                self.committer.drain()
+            with self.io_lock:
+                if only_if_due and not self.compaction_due():
+                    return
+                self.save_bookings()
+                self.commit_files()
+                self.save_records()
+                if self.snapshot_file:
+                    self.save_snapshot()
+                if self.journal:
+                    self.journal.reset()
 
     def save_flights(self):
-        # Save flights
-        with open(self.flights_file, mode='w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available"])
-            for flight in self.flights.values():
-                writer.writerow(flight.to_csv_format())
+        self.save_records(passengers=False)
 
     def save_passengers(self):
-        # Save passengers
-        with open(self.passengers_file, mode='w', newline='') as f:
+        self.save_records(flights=False)
+
+    def save_records(self, flights=True, passengers=True):
+        # Full rewrites go to temp files that one commit renames into place together
+        renames = []
+        if flights:
+            renames.append((write_temp_csv(self.flights_file, FLIGHT_HEADER,
+                                           (flight.to_csv_format() for flight in self.flights.values())),
+                            self.flights_file))
+            self.flight_delta_rows = 0
+        if passengers:
+            renames.append((write_temp_csv(self.passengers_file, PASSENGER_HEADER,
+                                           (passenger.to_csv_format() for passenger in self.passengers.values())),
+                            self.passengers_file))
+            self.passenger_delta_rows = 0
+        self.commit_files(renames)
+
+    def commit_files(self, renames=()):
+        # Writing the marker is the commit point. Folded deltas are recorded as empty, so a crash
+        # after the marker but before the renames finishes them on startup instead of mixing states.
+        sizes = [] if self.ledger else [self.bookings_file]
+        sizes += [self.flights_delta_file, self.passengers_delta_file]
+        folded = [path + ".delta" for _, path in renames]
+        marker = [["size", path, 0 if path in folded or not os.path.exists(path) else os.path.getsize(path)]
+                  for path in sizes]
+        if self.ledger:
+            # The ledger is appended before the records it covers, so it is cut back like bookings.csv
+            marker += [["size", path, size] for path, size in self.ledger.commit_sizes()]
+        self.write_marker(marker + [["rename", temp_path, path] for temp_path, path in renames])
+        if renames:
+            for temp_path, path in renames:
+                os.replace(temp_path, path)
+            for path in folded:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.write_marker(marker)
+
+    def write_marker(self, rows):
+        temp_path = self.commit_file + ".tmp"
+        with open(temp_path, mode='w', newline='') as f:
+            csv.writer(f).writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.commit_file)
+
+    def save_flight_changes(self, rows):
+        # rows are to_csv_format() lists; appended rows only count once commit_files records the new delta size
+        self.append_delta(self.flights_delta_file, FLIGHT_HEADER, rows)
+        self.flight_delta_rows += len(rows)
+
+    def save_passenger_changes(self, rows):
+        self.append_delta(self.passengers_delta_file, PASSENGER_HEADER, rows)
+        self.passenger_delta_rows += len(rows)
+
+    def append_delta(self, path, header, rows):
+        file_exists = os.path.exists(path)
+        with open(path, mode='a', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(["Passenger ID", "Name", "Contact Details", "Booked Flights"])
-            for passenger in self.passengers.values():
-                writer.writerow(passenger.to_csv_format())
+            if not file_exists:
+                writer.writerow(header)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
 
     def save_bookings(self):
-        # Save bookings
-        with open(self.bookings_file, mode='w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Transaction Type", "Flight ID", "Passenger ID", "Date"])
-            writer.writerows(self.bookings)
+        # The history is append-only, so only rows added since the last save are written
+        end = len(self.bookings)
+        if self.ledger:
+            self.ledger.append(self.bookings[self.bookings_saved:end])
+        else:
+            file_exists = os.path.exists(self.bookings_file)
+            with open(self.bookings_file, mode='a', newline='') as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(["Transaction Type", "Flight ID", "Passenger ID", "Date"])
+                writer.writerows(self.bookings[self.bookings_saved:end])
+                f.flush()
+                os.fsync(f.fileno())
+        self.mark_bookings_saved(end)
+
+    def mark_bookings_saved(self, end):
+        # Rows before end are now in storage
+        if self.bookings_history == "full" and not self.ledger:
+            self.bookings_saved = end
+        else:
+            # Saved rows can be read back from storage, so drop them from memory
+            del self.bookings[:end]
+            self.bookings_saved = 0
 
     def delete_booking(self, flight_id, passenger_id):
         with open(self.bookings_file, mode = 'r') as f:
@@ -112,62 +647,217 @@ class BookingManager:
             writer.writerows(self.data)
 
     def log_update(self, transaction_type, flight_id, passenger_id):
-        # Log the update into updateLog.csv
-        log_exists = os.path.exists(self.update_log_file)
-        with open(self.update_log_file, mode='a', newline='') as f:
-            writer = csv.writer(f)
-            if not log_exists:
-                writer.writerow(["Transaction Type", "Flight ID", "Passenger ID", "Timestamp"])
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            writer.writerow([transaction_type, flight_id, passenger_id, timestamp])
+        self.log_updates([[transaction_type, flight_id, passenger_id]])
+
+    def log_updates(self, rows):
+        self.update_log.write(rows)
+
+    @property
+    def update_log_file(self):
+        return self.update_log.path
+
+    @update_log_file.setter
+    def update_log_file(self, path):
+        self.update_log.set_path(path)
+
+    def read_update_log(self, passenger_id=None, flight_id=None, start=None, end=None):
+        # Stream logged rows, oldest first, optionally for one passenger or flight and within a time range
+        return self.update_log.read(passenger_id, flight_id, start, end)
 
     def view_schedule(self):
-        return [flight.to_csv_format() for flight in self.flights.values()]
+        # Chronological, read straight from the presorted schedule index
+        self.ensure_indexes()
+        return self.flight_results.rows(("schedule",), lambda: [entry[1] for entry in self.schedule_index.by_time],
+                                        self.flights)
+
+    def next_departures(self, after, count=10, departure=None, arrival=None):
+        # after is a timestamp, "YYYY-MM-DD" or "YYYY-MM-DD HH:MM"
+        self.ensure_indexes()
+        return [self.flights[flight_id].to_csv_format()
+                for flight_id in self.schedule_index.next_departures(parse_moment(after), count, departure, arrival)]
 
     def search_flight(self, query):
-        results = []
-        for flight in self.flights.values():
-            if query.lower() in (flight.flight_id + flight.departure + flight.arrival).lower():
-                results.append(flight.to_csv_format())
-        return results
+        self.ensure_indexes()
+        return self.flight_results.rows(("search", query.lower()), lambda: self.flight_index.search(query),
+                                        self.flights)
 
     def search_passenger(self, query):
+        self.ensure_indexes()
+        return self.passenger_results.rows(("search", query.lower()), lambda: self.passenger_index.search(query),
+                                           self.passengers)
+
+    def cache_stats(self):
+        return {"flights": self.flight_results.stats(), "passengers": self.passenger_results.stats()}
+
+    def get_manifest(self, flight_id):
+        self.ensure_indexes()
+        return list(self.manifests.get(flight_id, ()))
+
+    def find_flights(self, departure=None, arrival=None, start_date=None, end_date=None, min_seats=0):
+        # Route and date filters use the schedule index; seats are read live so they are always current
+        self.ensure_indexes()
         results = []
-        for passenger in self.passengers.values():
-            if query.lower() in (passenger.passenger_id + passenger.name + passenger.contact_details).lower():
-                results.append(passenger.to_csv_format())
+        for flight_id in self.schedule_index.query(departure, arrival, start_date, end_date):
+            flight = self.flights[flight_id]
+            if flight.seats_available >= min_seats:
+                results.append(flight.to_csv_format())
         return results
 
+    def find_itinerary(self, origin, destination, criterion="earliest", depart_after=None, min_connection=60,
+                       seats=1, max_hops=4, fare=None):
+        # criterion is "earliest" (arrival), "fewest_hops" or "cheapest" (needs fare(flight_id), as
+        # flights.csv has no prices). Returns the legs as flight rows, or [] if there is no route.
+        key = (origin.lower(), destination.lower(), criterion, depart_after, min_connection, max_hops)
+        cacheable = seats == 1 and fare is None
+        route = self.itineraries.get(key) if cacheable else None
+        # A search racing a sell-out can cache a full leg, so hits are checked before use
+        if route is not None and all(self.flights[flight_id].seats_available >= 1 for flight_id in route):
+            return [self.flights[flight_id].to_csv_format() for flight_id in route]
+
+        graph = self.route_graph
+        if graph is None:
+            with self.locks.exclusive():
+                graph = self.route_graph = RouteGraph(list(self.flights.values()))
+        route = graph.search(origin, destination, lambda flight_id: self.flights[flight_id].seats_available >= seats,
+                             criterion, depart_after, min_connection * 60, max_hops, fare)
+        if cacheable:
+            self.itineraries[key] = route
+        return [self.flights[flight_id].to_csv_format() for flight_id in route]
+
+    def add_flight(self, flight):
+        self.ensure_indexes()
+        with self.locks.exclusive(), self.io_lock:
+            self.flights[flight.flight_id] = flight
+            self.flight_index.add(flight.flight_id, flight.search_text())
+            self.schedule_index.add(flight)
+            self.route_graph = None
+            self.itineraries = {}
+            self.flight_results.clear()
+            self.flight_results.bump(flight.flight_id)
+            self.storage.save_flight(self, flight)
+        self.finish_change(None)
+        return f"Flight {flight.flight_id} added."
+
+    def add_passenger(self, passenger):
+        self.ensure_indexes()
+        with self.locks.exclusive(), self.io_lock:
+            self.passengers[passenger.passenger_id] = passenger
+            self.passenger_index.add(passenger.passenger_id, passenger.search_text())
+            self.add_to_manifests(passenger)
+            self.passenger_results.clear()
+            self.passenger_results.bump(passenger.passenger_id)
+            self.storage.save_passenger(self, passenger)
+        self.finish_change(None)
+        return f"Passenger {passenger.passenger_id} added."
+
+    def apply_booking(self, flight, passenger):
+        # In-memory half of a booking; callers hold the flight and passenger locks. The returned
+        # row joins the history when it is saved.
+        flight.seats_available -= 1
+        if flight.seats_available == 0:
+            self.itineraries = {}
+        passenger.add_flight(flight.flight_id)
+        if self.indexes_ready:
+            self.manifests.setdefault(flight.flight_id, {})[passenger.passenger_id] = None
+        self.flight_results.bump(flight.flight_id)
+        self.passenger_results.bump(passenger.passenger_id)
+        return ["BOOK", flight.flight_id, passenger.passenger_id, flight.date]
+
+    def apply_cancellation(self, flight, passenger):
+        flight.seats_available += 1
+        if flight.seats_available == 1:
+            self.itineraries = {}
+        passenger.remove_flight(flight.flight_id)
+        if self.indexes_ready:
+            self.manifests.get(flight.flight_id, {}).pop(passenger.passenger_id, None)
+        self.flight_results.bump(flight.flight_id)
+        self.passenger_results.bump(passenger.passenger_id)
+        return ["CANCEL", flight.flight_id, passenger.passenger_id, flight.date]
+
     def book_flight(self, flight_id, passenger_id):
         if flight_id in self.flights and passenger_id in self.passengers:
             flight = self.flights[flight_id]
             passenger = self.passengers[passenger_id]
-            if flight.seats_available > 0 and flight_id not in passenger.booked_flights:
-                flight.seats_available -= 1
-                passenger.add_flight(flight_id)
-                self.bookings.append(["BOOK", flight_id, passenger_id, flight.date])
-                self.save_flights()
-                self.save_bookings()
-                self.save_passengers()
-                self.log_update("BOOK", flight_id, passenger_id)
-                return f"Flight {flight_id} booked successfully for passenger {passenger_id}."
-            return "Booking failed: No seats available or duplicate booking."
+            with self.locks.hold([flight_id], [passenger_id]):
+                if flight.seats_available <= 0 or flight_id in passenger.booked_flights:
+                    return "Booking failed: No seats available or duplicate booking."
+                row = self.apply_booking(flight, passenger)
+                batch = self.record_changes([row])
+            self.finish_change(batch)
+            return f"Flight {flight_id} booked successfully for passenger {passenger_id}."
         return "Booking failed: Flight or passenger not found."
 
     def cancel_booking(self, flight_id, passenger_id):
         if flight_id in self.flights and passenger_id in self.passengers:
             flight = self.flights[flight_id]
             passenger = self.passengers[passenger_id]
-            if flight_id in passenger.booked_flights:
-                flight.seats_available += 1
-                passenger.remove_flight(flight_id)
-                self.bookings.append(["CANCEL", flight_id, passenger_id, flight.date])
-                self.save_flights()
-                self.save_bookings()
-                self.save_passengers()
+            with self.locks.hold([flight_id], [passenger_id]):
+                if flight_id not in passenger.booked_flights:
+                    return "Cancellation failed: Booking not found."
+                row = self.apply_cancellation(flight, passenger)
                 # self.delete_booking(flight_id, passenger_id)
-                self.log_update("CANCEL", flight_id, passenger_id)
-                return f"Booking for flight {flight_id} canceled for passenger {passenger_id}."
-            return "Cancellation failed: Booking not found."
+                batch = self.record_changes([row])
+            self.finish_change(batch)
+            return f"Booking for flight {flight_id} canceled for passenger {passenger_id}."
         return "Cancellation failed: Flight or passenger not found."
+
+    def book_many(self, pairs, all_or_nothing=True):
+        # Book (flight_id, passenger_id) pairs under one set of locks and persist them in one flush.
+        # Returns one message per pair, in order.
+        pairs = list(pairs)
+        with self.locks.hold([pair[0] for pair in pairs], [pair[1] for pair in pairs]):
+            # Validate the whole batch first, counting seats the batch itself takes
+            seats_taken = {}
+            seen = set()
+            messages = []
+            accepted = []
+            for flight_id, passenger_id in pairs:
+                flight = self.flights.get(flight_id)
+                passenger = self.passengers.get(passenger_id)
+                if not flight or not passenger:
+                    messages.append("Booking failed: Flight or passenger not found.")
+                    continue
+                taken = seats_taken.get(flight_id, 0)
+                if flight.seats_available - taken <= 0 or flight_id in passenger.booked_flights \
+                        or (flight_id, passenger_id) in seen:
+                    messages.append("Booking failed: No seats available or duplicate booking.")
+                    continue
+                seats_taken[flight_id] = taken + 1
+                seen.add((flight_id, passenger_id))
+                accepted.append((flight, passenger))
+                messages.append(f"Flight {flight_id} booked successfully for passenger {passenger_id}.")
+
+            if all_or_nothing and len(accepted) < len(pairs):
+                return [message if message.startswith("Booking failed") else
+                        "Booking not made: another booking in the batch failed." for message in messages]
+            rows = [self.apply_booking(flight, passenger) for flight, passenger in accepted]
+            batch = self.record_changes(rows) if rows else None
+        self.finish_change(batch)
+        return messages
+
+    def cancel_many(self, pairs, all_or_nothing=True):
+        pairs = list(pairs)
+        with self.locks.hold([pair[0] for pair in pairs], [pair[1] for pair in pairs]):
+            seen = set()
+            messages = []
+            accepted = []
+            for flight_id, passenger_id in pairs:
+                flight = self.flights.get(flight_id)
+                passenger = self.passengers.get(passenger_id)
+                if not flight or not passenger:
+                    messages.append("Cancellation failed: Flight or passenger not found.")
+                    continue
+                if flight_id not in passenger.booked_flights or (flight_id, passenger_id) in seen:
+                    messages.append("Cancellation failed: Booking not found.")
+                    continue
+                seen.add((flight_id, passenger_id))
+                accepted.append((flight, passenger))
+                messages.append(f"Booking for flight {flight_id} canceled for passenger {passenger_id}.")
+
+            if all_or_nothing and len(accepted) < len(pairs):
+                return [message if message.startswith("Cancellation failed") else
+                        "Cancellation not made: another cancellation in the batch failed." for message in messages]
+            rows = [self.apply_cancellation(flight, passenger) for flight, passenger in accepted]
+            batch = self.record_changes(rows) if rows else None
+        self.finish_change(batch)
+        return messages
@@ -0,0 +1,88 @@
+import threading
+import time
+
+class GroupCommitter:
+    def __init__(self, flush, window=0.005, max_batch=64):
+        # flush(items) makes a whole batch of submitted items durable in one go
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self.condition = threading.Condition()
+        self.pending = []
+        self.next_batch = 1
+        self.flushed = 0
+        self.errors = {}
+        # batch -> submitters that have not waited on it yet; a batch's error is kept until all of them have
+        self.waiters = {}
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="group-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, items):
+        # Queue items for the next flush and return the batch number to wait on
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Group committer is closed.")
+            self.pending.extend(items)
+            if len(self.pending) == len(items) or len(self.pending) >= self.max_batch:
+                self.condition.notify_all()
+            self.waiters[self.next_batch] = self.waiters.get(self.next_batch, 0) + 1
+            return self.next_batch
+
+    def wait(self, batch):
+        # Block until the flush containing this batch has finished
+        with self.condition:
+            while self.flushed < batch:
+                self.condition.wait()
+            error = self.errors.get(batch)
+            self.waiters[batch] -= 1
+            if not self.waiters[batch]:
+                del self.waiters[batch]
+                self.errors.pop(batch, None)
+        if error:
+            raise error
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                # Give concurrent callers the rest of the window to join this batch
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.max_batch and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                rows = self.pending
+                self.pending = []
+                batch = self.next_batch
+                self.next_batch += 1
+
+            error = None
+            try:
+                self.flush(rows)
+            except Exception as e:
+                error = e
+
+            with self.condition:
+                self.flushed = batch
+                if error:
+                    self.errors[batch] = error
+                self.condition.notify_all()
+
+    def drain(self):
+        # Block until everything submitted so far has been flushed
+        with self.condition:
+            last = self.next_batch if self.pending else self.next_batch - 1
+            while self.flushed < last:
+                self.condition.wait()
+
+    def close(self):
+        # Flush whatever is still pending and stop the background thread
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
@@ -0,0 +1,31 @@
+import argparse
+import csv
+from flight_booking_backend import BookingManager
+from storage import create_storage
+
+def read_manifest(path):
+    # A manifest is a CSV with "Flight ID" and "Passenger ID" columns
+    with open(path, mode='r', newline='') as f:
+        reader = csv.DictReader(f)
+        return [(row["Flight ID"], row["Passenger ID"]) for row in reader]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Book or cancel a whole manifest of group bookings at once.")
+    parser.add_argument("manifest_file")
+    parser.add_argument("--cancel", action="store_true", help="cancel the listed bookings instead")
+    parser.add_argument("--best-effort", action="store_true", help="apply the valid rows even if some fail")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    args = parser.parse_args()
+
+    manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv", storage=create_storage(args.backend))
+    pairs = read_manifest(args.manifest_file)
+    action = manager.cancel_many if args.cancel else manager.book_many
+    messages = action(pairs, all_or_nothing=not args.best_effort)
+    manager.close()
+
+    failed = 0
+    for (flight_id, passenger_id), message in zip(pairs, messages):
+        if "successfully" not in message and "canceled for" not in message:
+            failed += 1
+            print(f"{flight_id},{passenger_id}: {message}")
+    print(f"{len(pairs) - failed} of {len(pairs)} rows applied.")
@@ -0,0 +1,81 @@
+import heapq
+from bisect import bisect_left
+from schedule_index import UNSCHEDULED, parse_moment
+
+class RouteGraph:
+    def __init__(self, flights, flight_duration=2 * 60 * 60):
+        # Times are epoch seconds. flights.csv has no arrival times, so every leg is assumed to
+        # take flight_duration
+        self.legs = {}
+        # city -> flight IDs leaving it in departure order, with their departure times for bisect
+        self.outbound = {}
+        self.outbound_times = {}
+        by_city = {}
+        for flight in flights:
+            departure = flight.departs_at
+            if departure == UNSCHEDULED:
+                continue
+            self.legs[flight.flight_id] = (flight.departure.lower(), flight.arrival.lower(),
+                                           departure, departure + flight_duration)
+            by_city.setdefault(flight.departure.lower(), []).append((departure, flight.flight_id))
+        for city, entries in by_city.items():
+            entries.sort()
+            self.outbound[city] = [flight_id for _, flight_id in entries]
+            self.outbound_times[city] = [departure for departure, _ in entries]
+
+    def search(self, origin, destination, can_board, criterion="earliest", depart_after=None,
+               min_connection=60 * 60, max_hops=4, fare=None):
+        # Time-aware Dijkstra where each node is a flight taken. A flight's successors depend only on
+        # where and when it lands, so the first time a flight is popped its cost is optimal.
+        if criterion == "cheapest" and fare is None:
+            raise ValueError("The cheapest route needs a fare(flight_id) function.")
+        origin, destination = origin.lower(), destination.lower()
+
+        def cost(flight_id, previous_cost, hops):
+            arrival = self.legs[flight_id][3]
+            if criterion == "earliest":
+                return (arrival,)
+            if criterion == "fewest_hops":
+                return (hops, arrival)
+            if criterion == "cheapest":
+                return ((previous_cost[0] if previous_cost else 0) + fare(flight_id), arrival)
+            raise ValueError(f"Unknown criterion {criterion!r}.")
+
+        heap = []
+        counter = 0
+        # city -> (lowest outbound index already relaxed, hop count it was relaxed with); a later
+        # expansion with at least as many hops only needs the earlier-departing flights before it
+        relaxed = {}
+
+        def expand(city, ready, previous_cost, hops, parent):
+            nonlocal counter
+            flights = self.outbound.get(city, [])
+            start = bisect_left(self.outbound_times.get(city, []), ready)
+            end = len(flights)
+            previous = relaxed.get(city)
+            if previous and previous[1] <= hops:
+                end = previous[0]
+                relaxed[city] = (min(start, previous[0]), hops)
+            else:
+                relaxed[city] = (start, hops)
+            for flight_id in flights[start:end]:
+                if flight_id not in settled and can_board(flight_id):
+                    counter += 1
+                    heapq.heappush(heap, (cost(flight_id, previous_cost, hops + 1), counter, flight_id, hops + 1, parent))
+
+        settled = {}
+        expand(origin, parse_moment(depart_after) if depart_after else 0, None, 0, None)
+        while heap:
+            current_cost, _, flight_id, hops, parent = heapq.heappop(heap)
+            if flight_id in settled:
+                continue
+            settled[flight_id] = parent
+            _, arrival_city, _, arrival = self.legs[flight_id]
+            if arrival_city == destination:
+                route = [flight_id]
+                while settled[route[-1]] is not None:
+                    route.append(settled[route[-1]])
+                return route[::-1]
+            if hops < max_hops:
+                expand(arrival_city, arrival + min_connection, current_cost, hops, flight_id)
+        return []
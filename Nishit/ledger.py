@@ -0,0 +1,201 @@
+import csv
+import os
+import re
+
+SEGMENT_NAME = re.compile(r"(?:segment|compacted)-(\d+)\.csv$")
+
+def segment_number(name):
+    match = SEGMENT_NAME.match(name)
+    return int(match.group(1)) if match else 0
+
+class BookingLedger:
+    def __init__(self, directory, segment_rows=100000, compact_segments=8):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        # Closed segments are compacted together once this many have built up
+        self.compact_segments = compact_segments
+        self.index_file = os.path.join(directory, "index.csv")
+        # Closed segments in history order: [file name, rows, first date, last date]
+        self.segments = []
+        self.active_number = 1
+        self.active_rows = 0
+        self.active_first = None
+        self.active_last = None
+        self.file = None
+        self.writer = None
+        # Materialized view of live bookings: (flight_id, passenger_id) -> date
+        self.current = {}
+
+    def active_name(self):
+        return f"segment-{self.active_number:06d}.csv"
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.segments = []
+        try:
+            with open(self.index_file, mode='r', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                self.segments = [[row[0], int(row[1]), row[2], row[3]] for row in reader]
+        except FileNotFoundError:
+            pass
+
+        # The active segment is the newest segment file not yet listed in the index; anything
+        # else unlisted was left behind by an interrupted compaction
+        listed = {segment[0] for segment in self.segments}
+        last_listed = max((segment_number(name) for name in listed), default=0)
+        unlisted = [segment_number(name) for name in os.listdir(self.directory)
+                    if name.startswith("segment-") and name not in listed]
+        self.active_number = max(unlisted + [last_listed + 1])
+        for name in os.listdir(self.directory):
+            if name.endswith((".csv", ".tmp")) and name not in listed and name not in (self.active_name(), "index.csv"):
+                os.remove(self.path(name))
+
+        self.current = {}
+        self.active_rows = 0
+        self.active_first = self.active_last = None
+        for segment in self.segments:
+            for row in self.read_segment(segment[0]):
+                self.apply(row)
+        for row in self.read_segment(self.active_name()):
+            self.apply(row)
+            self.track_active(row)
+
+    def read_segment(self, name):
+        try:
+            with open(self.path(name), mode='r', newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) == 4:
+                        yield row
+        except FileNotFoundError:
+            return
+
+    def apply(self, row):
+        key = (row[1], row[2])
+        if row[0] == "BOOK":
+            self.current[key] = row[3]
+        elif row[0] == "CANCEL":
+            self.current.pop(key, None)
+
+    def track_active(self, row):
+        self.active_rows += 1
+        if self.active_first is None or row[3] < self.active_first:
+            self.active_first = row[3]
+        if self.active_last is None or row[3] > self.active_last:
+            self.active_last = row[3]
+
+    def append(self, rows):
+        # Cost depends only on the rows being appended, never on the size of the history.
+        # A full segment is closed before the next append rather than part way through one, so
+        # every append lands in a single segment that a commit marker can cut back by size.
+        if rows and self.active_rows >= self.segment_rows:
+            self.rotate()
+        for row in rows:
+            if self.file is None:
+                self.file = open(self.path(self.active_name()), mode='a', newline='')
+                self.writer = csv.writer(self.file)
+            self.writer.writerow(row)
+            self.apply(row)
+            self.track_active(row)
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def commit_sizes(self):
+        # [path, size] of every file the next append can write: the active segment as it stands and the
+        # segment a rotation would start. Recorded in a commit marker, they undo appends never committed.
+        active = self.path(self.active_name())
+        return [[active, os.path.getsize(active) if os.path.exists(active) else 0],
+                [self.path(f"segment-{self.active_number + 1:06d}.csv"), 0]]
+
+    def rotate(self):
+        self.close()
+        self.segments.append([self.active_name(), self.active_rows, self.active_first, self.active_last])
+        self.write_index()
+        self.active_number += 1
+        self.active_rows = 0
+        self.active_first = self.active_last = None
+        if len(self.segments) >= self.compact_segments:
+            self.compact()
+
+    def write_index(self):
+        temp_path = self.index_file + ".tmp"
+        with open(temp_path, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Segment", "Rows", "First Date", "Last Date"])
+            writer.writerows(self.segments)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.index_file)
+
+    def compact(self):
+        # Merge every closed segment into one, dropping BOOK rows that a later CANCEL undoes
+        if not self.segments:
+            return
+        open_books = {}
+        dropped = set()
+        for position, row in enumerate(self.closed_rows()):
+            key = (row[1], row[2])
+            if row[0] == "BOOK":
+                open_books[key] = position
+            elif row[0] == "CANCEL" and key in open_books:
+                dropped.add(open_books.pop(key))
+                dropped.add(position)
+
+        name = f"compacted-{segment_number(self.segments[-1][0]):06d}.csv"
+        kept = 0
+        first = last = None
+        temp_path = self.path(name) + ".tmp"
+        with open(temp_path, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            for position, row in enumerate(self.closed_rows()):
+                if position in dropped:
+                    continue
+                writer.writerow(row)
+                kept += 1
+                first = row[3] if first is None or row[3] < first else first
+                last = row[3] if last is None or row[3] > last else last
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path(name))
+        if not kept:
+            os.remove(self.path(name))
+
+        old_names = [segment[0] for segment in self.segments]
+        self.segments = [[name, kept, first or "", last or ""]] if kept else []
+        # Once the new index is in place the old segments are garbage
+        self.write_index()
+        for old_name in old_names:
+            if old_name != name:
+                os.remove(self.path(old_name))
+
+    def closed_rows(self):
+        for segment in self.segments:
+            yield from self.read_segment(segment[0])
+
+    def history(self, start_date=None, end_date=None, flight_id=None, passenger_id=None):
+        # Segments whose date range misses [start_date, end_date] are never opened
+        ranges = [(segment[0], segment[2], segment[3]) for segment in self.segments]
+        if self.active_rows:
+            ranges.append((self.active_name(), self.active_first, self.active_last))
+        for name, first, last in ranges:
+            if (start_date and last < start_date) or (end_date and first > end_date):
+                continue
+            for row in self.read_segment(name):
+                if start_date and row[3] < start_date or end_date and row[3] > end_date:
+                    continue
+                if flight_id and row[1] != flight_id or passenger_id and row[2] != passenger_id:
+                    continue
+                yield row
+
+    def current_bookings(self, flight_id=None):
+        return [[key[0], key[1], date] for key, date in self.current.items() if not flight_id or key[0] == flight_id]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
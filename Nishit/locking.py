@@ -0,0 +1,59 @@
+import threading
+from contextlib import contextmanager
+
+class LockTable:
+    def __init__(self):
+        self.guard = threading.Lock()
+        self.locks = {}
+        # Bookings share the state; compaction and schedule changes need it exclusively
+        self.condition = threading.Condition()
+        self.sharers = 0
+        self.exclusive_waiting = 0
+        self.exclusive_held = False
+
+    def get(self, key):
+        lock = self.locks.get(key)
+        if lock is None:
+            with self.guard:
+                lock = self.locks.setdefault(key, threading.Lock())
+        return lock
+
+    @contextmanager
+    def hold(self, flight_ids=(), passenger_ids=()):
+        # Flight locks before passenger locks, each in sorted order, so callers never deadlock
+        keys = sorted(("F", flight_id) for flight_id in set(flight_ids))
+        keys += sorted(("P", passenger_id) for passenger_id in set(passenger_ids))
+        locks = [self.get(key) for key in keys]
+        with self.condition:
+            while self.exclusive_held or self.exclusive_waiting:
+                self.condition.wait()
+            self.sharers += 1
+        try:
+            for lock in locks:
+                lock.acquire()
+            try:
+                yield
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        finally:
+            with self.condition:
+                self.sharers -= 1
+                if not self.sharers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        # Waits for every in-flight booking to finish and holds new ones off
+        with self.condition:
+            self.exclusive_waiting += 1
+            while self.exclusive_held or self.sharers:
+                self.condition.wait()
+            self.exclusive_waiting -= 1
+            self.exclusive_held = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.exclusive_held = False
+                self.condition.notify_all()
@@ -0,0 +1,215 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    # Opt-in instrumentation. instrument() swaps timed wrappers onto one object's methods and
+    # uninstrument() puts the originals back, so a manager without metrics runs untouched code.
+    def __init__(self):
+        self.lock = threading.Lock()
+        # name -> [count, total seconds, per-bucket counts with a final +Inf bucket]
+        self.timers = {}
+        self.counters = {}
+        # persistence step -> bytes written by it
+        self.bytes_written = {}
+        # Bytes written while saving booking rows, the part of bytes_written that mutations cost
+        self.mutation_bytes = 0
+        self.mutation_path = threading.local()
+        self.wrapped = []
+        self.sample_rate = 0.0
+        self.profile_stats = None
+        self.profiling = threading.local()
+        self.dump_thread = None
+        self.dump_stop = threading.Event()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = [0, 0.0, [0] * (len(BUCKETS) + 1)]
+            timer[0] += 1
+            timer[1] += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    timer[2][i] += 1
+                    break
+            else:
+                timer[2][-1] += 1
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_bytes(self, step, amount):
+        with self.lock:
+            self.bytes_written[step] = self.bytes_written.get(step, 0) + amount
+            if getattr(self.mutation_path, "active", False):
+                self.mutation_bytes += amount
+
+    def wrap(self, owner, name, metric, appended=None, rewritten=None, written=None, mutations=None,
+             mutation_path=False):
+        # appended returns the paths the call appends to and rewritten, given the call's arguments, the
+        # paths it replaces, for byte counts; written returns a running byte count, for writers that
+        # buffer before the file grows. mutations, given the call's arguments, returns the booking rows
+        # a successful call saved. Bytes written during a mutation_path call count towards those rows.
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            before = sum(file_size(path) for path in appended()) if appended else 0
+            written_before = written() if written else 0
+            outer_path = getattr(self.mutation_path, "active", False)
+            if mutation_path:
+                self.mutation_path.active = True
+            profile = None
+            if self.sample_rate and not getattr(self.profiling, "active", False) and random.random() < self.sample_rate:
+                profile = cProfile.Profile()
+                self.profiling.active = True
+                profile.enable()
+            start = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+                if mutations:
+                    self.count("mutations", mutations(*args, **kwargs))
+                return result
+            finally:
+                self.observe(metric, time.perf_counter() - start)
+                if profile is not None:
+                    profile.disable()
+                    self.profiling.active = False
+                    self.add_profile(profile)
+                if appended:
+                    self.add_bytes(metric, max(0, sum(file_size(path) for path in appended()) - before))
+                if rewritten:
+                    self.add_bytes(metric, sum(file_size(path) for path in rewritten(*args, **kwargs)))
+                if written:
+                    self.add_bytes(metric, written() - written_before)
+                self.mutation_path.active = outer_path
+
+        setattr(owner, name, timed)
+        self.wrapped.append((owner, name))
+
+    def instrument(self, manager):
+        for name in ("search_flight", "search_passenger", "find_flights", "find_itinerary", "view_schedule",
+                     "next_departures", "get_manifest", "booking_history", "add_flight", "add_passenger"):
+            self.wrap(manager, name, name)
+        for name in ("book_flight", "cancel_booking", "book_many", "cancel_many"):
+            self.wrap(manager, name, name)
+
+        # Persistence steps, each with the bytes it writes. Every saved booking row is one mutation, and
+        # only the bytes written to save rows and log them count towards bytes_per_mutation.
+        bookings = (lambda: []) if manager.ledger else (lambda: [manager.bookings_file])
+        self.wrap(manager, "save_changes", "save_changes", mutations=lambda rows, flights, passengers: len(rows),
+                  mutation_path=True)
+        self.wrap(manager, "save_bookings", "save_bookings", appended=bookings)
+        self.wrap(manager, "save_flight_changes", "save_flight_changes", appended=lambda: [manager.flights_delta_file])
+        self.wrap(manager, "save_passenger_changes", "save_passenger_changes",
+                  appended=lambda: [manager.passengers_delta_file])
+        self.wrap(manager, "save_records", "save_records",
+                  rewritten=lambda flights=True, passengers=True: [path for path, saved in (
+                      (manager.flights_file, flights), (manager.passengers_file, passengers)) if saved])
+        self.wrap(manager, "commit_files", "commit_files", rewritten=lambda renames=(): [manager.commit_file])
+        self.wrap(manager, "log_updates", "log_updates", written=lambda: manager.update_log.bytes_written,
+                  mutation_path=True)
+        self.wrap(manager, "compact", "compact")
+        if manager.snapshot_file:
+            self.wrap(manager, "save_snapshot", "save_snapshot", rewritten=lambda: [manager.snapshot_file])
+        if manager.journal:
+            self.wrap(manager.journal, "append", "journal_append", appended=lambda: [manager.journal.journal_file])
+        if manager.committer:
+            self.wrap(manager.committer, "wait", "group_commit_wait")
+
+    def uninstrument(self):
+        for owner, name in self.wrapped:
+            delattr(owner, name)
+        self.wrapped = []
+
+    def start_profiling(self, sample_rate=0.01):
+        # Profile roughly one call in 1 / sample_rate; can be switched on and off while running
+        self.sample_rate = sample_rate
+
+    def stop_profiling(self):
+        self.sample_rate = 0.0
+
+    def add_profile(self, profile):
+        with self.lock:
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats(profile)
+            else:
+                self.profile_stats.add(profile)
+
+    def profile_report(self, sort="cumulative", limit=30):
+        if self.profile_stats is None:
+            return ""
+        out = io.StringIO()
+        with self.lock:
+            self.profile_stats.stream = out
+            self.profile_stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def snapshot(self):
+        with self.lock:
+            timers = {name: {"count": timer[0], "total_s": timer[1], "mean_s": timer[1] / timer[0],
+                             "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], timer[2]))}
+                      for name, timer in self.timers.items()}
+            counters = dict(self.counters)
+            bytes_written = dict(self.bytes_written)
+            mutation_bytes = self.mutation_bytes
+        mutations = counters.get("mutations", 0)
+        return {"timers": timers, "counters": counters, "bytes_written": bytes_written,
+                "bytes_per_mutation": mutation_bytes / mutations if mutations else None}
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = ["# TYPE booking_operation_seconds histogram"]
+        for name, timer in sorted(snapshot["timers"].items()):
+            cumulative = 0
+            for bound, count in timer["buckets"].items():
+                cumulative += count
+                lines.append(f'booking_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'booking_operation_seconds_sum{{operation="{name}"}} {timer["total_s"]}')
+            lines.append(f'booking_operation_seconds_count{{operation="{name}"}} {timer["count"]}')
+        lines.append("# TYPE booking_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'booking_events_total{{event="{name}"}} {value}')
+        lines.append("# TYPE booking_bytes_written_total counter")
+        for step, value in sorted(snapshot["bytes_written"].items()):
+            lines.append(f'booking_bytes_written_total{{step="{step}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        temp_path = path + ".tmp"
+        with open(temp_path, mode='w') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def start_dumps(self, path, interval=15.0):
+        # Rewrite path in Prometheus text format every interval seconds, e.g. for node_exporter's textfile collector
+        self.stop_dumps()
+        self.dump_stop.clear()
+
+        def run():
+            while not self.dump_stop.wait(interval):
+                self.write_prometheus(path)
+            self.write_prometheus(path)
+
+        self.dump_thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        self.dump_thread.start()
+
+    def stop_dumps(self):
+        if self.dump_thread is not None:
+            self.dump_stop.set()
+            self.dump_thread.join()
+            self.dump_thread = None
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+class ResultCache:
+    # LRU cache of query results as (record IDs, row versions, rows). Bookings only change rows, never
+    # which records match, so they bump the version of the one flight or passenger touched and a hit
+    # rebuilds just the rows whose version moved. clear() is for changes that alter the matches.
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # Bumped by clear(), so a miss computed before it is not stored after it
+        self.generation = 0
+        # record ID -> version, bumped after each change to that record
+        self.versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshed_rows = 0
+
+    def bump(self, record_id):
+        with self.lock:
+            self.versions[record_id] = self.versions.get(record_id, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def rows(self, key, find_ids, records):
+        # find_ids() lists the matching IDs on a miss; records maps an ID to its object with to_csv_format()
+        generation = None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                generation = self.generation
+        if entry is None:
+            ids = find_ids()
+            entry = (ids, [None] * len(ids), [None] * len(ids))
+
+        with self.lock:
+            if key not in self.entries and generation == self.generation:
+                self.entries[key] = entry
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            ids, versions, rows = entry
+            current = self.versions
+            for i, record_id in enumerate(ids):
+                version = current.get(record_id, 0)
+                if versions[i] != version:
+                    # Version before the row: a change racing this read leaves the row looking stale, not fresh
+                    rows[i] = records[record_id].to_csv_format()
+                    versions[i] = version
+                    self.refreshed_rows += 1
+            return list(rows)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "max_entries": self.max_entries, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / lookups if lookups else None,
+                    "refreshed_rows": self.refreshed_rows}
@@ -0,0 +1,129 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import messagebox, ttk
+
+FLIGHT_COLUMNS = ("Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available")
+PASSENGER_COLUMNS = ("Passenger ID", "Name", "Contact", "Booked Flights")
+
+class PagedResults(tk.Frame):
+    # A Treeview holding only the current page of rows; the full result list stays in Python
+    def __init__(self, parent, columns, page_size=100, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.rows = []
+        self.page = 0
+        self.page_size = page_size
+        self.empty_message = ""
+
+        controls = tk.Frame(self, bg=self["bg"])
+        controls.pack(side=tk.BOTTOM, fill="x", pady=5)
+        self.previous_button = tk.Button(controls, text="< Previous", command=lambda: self.show_page(self.page - 1))
+        self.previous_button.pack(side=tk.LEFT, padx=5)
+        self.next_button = tk.Button(controls, text="Next >", command=lambda: self.show_page(self.page + 1))
+        self.next_button.pack(side=tk.LEFT, padx=5)
+        self.status = tk.Label(controls, text="", bg=self["bg"])
+        self.status.pack(side=tk.LEFT, padx=10)
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        for column in columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=120, anchor="w")
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        self.show_page(0)
+
+    def show(self, rows, empty_message="No results."):
+        self.rows = rows
+        self.empty_message = empty_message
+        self.show_page(0)
+
+    def show_message(self, message):
+        self.rows = []
+        self.empty_message = message
+        self.show_page(0)
+
+    def show_page(self, page):
+        pages = max(1, -(-len(self.rows) // self.page_size))
+        self.page = max(0, min(page, pages - 1))
+        self.tree.delete(*self.tree.get_children())
+        start = self.page * self.page_size
+        for row in self.rows[start:start + self.page_size]:
+            self.tree.insert("", tk.END, values=row)
+
+        if self.rows:
+            end = min(start + self.page_size, len(self.rows))
+            self.status.config(text=f"Rows {start + 1}-{end} of {len(self.rows)}")
+        else:
+            self.status.config(text=self.empty_message)
+        self.previous_button.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self.page < pages - 1 else tk.DISABLED)
+
+class BackgroundSearch:
+    # Runs searches on a worker thread so the window never blocks. Only the newest search matters:
+    # key presses restart a short timer, a waiting search is replaced by a newer one, and results
+    # of superseded searches are dropped. Tk is only touched from the UI thread via after().
+    def __init__(self, root, delay=250, poll_interval=20):
+        self.root = root
+        self.delay = delay
+        self.poll_interval = poll_interval
+        self.timer = None
+        self.generation = 0
+        self.delivered = 0
+        self.polling = False
+        # (generation, search, done) waiting for the worker; newer submissions overwrite it
+        self.pending = None
+        self.condition = threading.Condition()
+        self.results = queue.Queue()
+        threading.Thread(target=self.work, daemon=True).start()
+
+    def debounce(self, search, done):
+        # For as-you-type search: run once typing pauses for delay milliseconds
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+        self.timer = self.root.after(self.delay, self.submit, search, done)
+
+    def submit(self, search, done):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        self.generation += 1
+        with self.condition:
+            self.pending = (self.generation, search, done)
+            self.condition.notify()
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                generation, search, done = self.pending
+                self.pending = None
+            if generation != self.generation:
+                continue
+            try:
+                self.results.put((generation, done, search(), None))
+            except Exception as error:
+                self.results.put((generation, done, None, error))
+
+    def poll(self):
+        while True:
+            try:
+                generation, done, results, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.delivered = generation
+            if generation != self.generation:
+                continue
+            if error is not None:
+                messagebox.showerror("Search failed", str(error))
+            else:
+                done(results)
+        if self.delivered == self.generation:
+            self.polling = False
+        else:
+            self.root.after(self.poll_interval, self.poll)
@@ -0,0 +1,100 @@
+from bisect import bisect_left, insort
+from datetime import date as calendar_date
+from functools import lru_cache
+
+EPOCH_DAY = calendar_date(1970, 1, 1).toordinal()
+DAY = 24 * 60 * 60
+# departs_at of a flight whose date or time cannot be read; it sorts after every real departure
+UNSCHEDULED = float("inf")
+
+# Few distinct dates and times repeat across many flights, so each string is parsed once
+@lru_cache(maxsize=4096)
+def date_timestamp(date):
+    # "2025-01-10" -> seconds since the epoch at midnight; flight times carry no zone, so read as UTC
+    return (calendar_date.fromisoformat(date.strip()).toordinal() - EPOCH_DAY) * DAY
+
+@lru_cache(maxsize=2048)
+def time_seconds(time):
+    # "10:00 AM" or "14:30" -> seconds after midnight
+    clock, _, meridiem = time.strip().partition(" ")
+    hours, _, minutes = clock.partition(":")
+    hours = int(hours)
+    if meridiem:
+        hours %= 12
+        if meridiem.upper() == "PM":
+            hours += 12
+    return (hours * 60 + int(minutes or 0)) * 60
+
+def departure_timestamp(date, time):
+    # Bad rows still load, listed last in the schedule and left out of date and time searches
+    try:
+        return date_timestamp(date) + time_seconds(time)
+    except (ValueError, TypeError, AttributeError):
+        return UNSCHEDULED
+
+def parse_moment(value):
+    # A timestamp, "2025-01-10" or "2025-01-10 14:30" -> seconds since the epoch
+    if isinstance(value, (int, float)):
+        return value
+    day, _, time = value.strip().partition(" ")
+    try:
+        return date_timestamp(day) + (time_seconds(time) if time else 0)
+    except ValueError:
+        raise ValueError(f"Cannot read date and time {value!r}.") from None
+
+class ScheduleIndex:
+    def __init__(self):
+        # Every list holds (departs_at, flight_id) entries kept sorted with bisect
+        self.by_time = []
+        self.routes = {}
+        self.departures = {}
+        self.arrivals = {}
+        self.entries = {}
+
+    def add(self, flight):
+        self.remove(flight.flight_id)
+        departure = flight.departure.lower()
+        arrival = flight.arrival.lower()
+        entry = (flight.departs_at, flight.flight_id)
+        self.entries[flight.flight_id] = (entry, departure, arrival)
+        insort(self.by_time, entry)
+        insort(self.routes.setdefault((departure, arrival), []), entry)
+        insort(self.departures.setdefault(departure, []), entry)
+        insort(self.arrivals.setdefault(arrival, []), entry)
+
+    def remove(self, flight_id):
+        found = self.entries.pop(flight_id, None)
+        if found is None:
+            return
+        entry, departure, arrival = found
+        for entries in (self.by_time, self.routes[(departure, arrival)],
+                        self.departures[departure], self.arrivals[arrival]):
+            del entries[bisect_left(entries, entry)]
+
+    def entries_for(self, departure=None, arrival=None):
+        if departure is not None and arrival is not None:
+            return self.routes.get((departure.lower(), arrival.lower()), [])
+        if departure is not None:
+            return self.departures.get(departure.lower(), [])
+        if arrival is not None:
+            return self.arrivals.get(arrival.lower(), [])
+        return self.by_time
+
+    def query(self, departure=None, arrival=None, start_date=None, end_date=None):
+        # Flight IDs in chronological order; dates are inclusive "YYYY-MM-DD" strings
+        entries = self.entries_for(departure, arrival)
+        low = bisect_left(entries, (date_timestamp(start_date),)) if start_date else 0
+        if end_date:
+            high = bisect_left(entries, (date_timestamp(end_date) + DAY,))
+        elif start_date:
+            high = bisect_left(entries, (UNSCHEDULED,))
+        else:
+            high = len(entries)
+        return [entry[1] for entry in entries[low:high]]
+
+    def next_departures(self, after, count, departure=None, arrival=None):
+        # The first count flight IDs departing at or after the timestamp after
+        entries = self.entries_for(departure, arrival)
+        low = bisect_left(entries, (after,))
+        high = min(low + count, bisect_left(entries, (UNSCHEDULED,)))
+        return [entry[1] for entry in entries[low:high]]
@@ -0,0 +1,56 @@
+from array import array
+
+class NGramIndex:
+    def __init__(self, n=3):
+        self.n = n
+        # gram -> slots of every record whose text contains it
+        self.postings = {}
+        self.slots = {}
+        # Slot order is insertion order, so results come back in the same order as the dict they index
+        self.keys = []
+        self.texts = []
+
+    def grams(self, text):
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, key, text):
+        text = text.lower()
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.keys)
+            self.slots[key] = slot
+            self.keys.append(key)
+            self.texts.append(text)
+        else:
+            # Stale postings for the old text are filtered out by the substring check in search()
+            self.texts[slot] = text
+        for gram in self.grams(text):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('l')
+            posting.append(slot)
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.keys[slot] = None
+            self.texts[slot] = ""
+
+    def search(self, query):
+        # Same results as `query.lower() in text.lower()` over every record
+        query = query.lower()
+        if len(query) < self.n:
+            candidates = range(len(self.keys))
+        else:
+            # Only records in the rarest gram's posting list can contain the query
+            rarest = None
+            for gram in self.grams(query):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return []
+                if rarest is None or len(posting) < len(rarest):
+                    rarest = posting
+            candidates = sorted(set(rarest))
+        texts = self.texts
+        keys = self.keys
+        return [keys[slot] for slot in candidates if keys[slot] is not None and query in texts[slot]]
@@ -0,0 +1,416 @@
+import argparse
+import csv
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from flight_booking_backend import FLIGHT_HEADER, PASSENGER_HEADER, BookingManager, Flight, Passenger
+from schedule_index import departure_timestamp, parse_moment
+from search_index import NGramIndex
+
+# Layout of a sharded data directory:
+#   shards.csv                  shard count; written last, so its presence means the split finished
+#   passengers.csv              the passenger directory (ID, name, contact), owned by the coordinator
+#   booking_order.csv           passenger ID, flight ID per booking, so merged flight lists keep booking order
+#   shard-NN/flights.csv        the flights hashed to shard NN, with their seat counters
+#   shard-NN/passengers.csv     passengers with bookings on shard NN, listing only those flights
+#   shard-NN/bookings.csv       booking history for shard NN's flights
+#   shard-NN/journal.csv
+
+def shard_of(flight_id, shards):
+    # crc32 rather than hash() so the mapping is the same in every process and every run
+    return zlib.crc32(flight_id.encode()) % shards
+
+def shard_path(shard_dir, shard, name):
+    return os.path.join(shard_dir, f"shard-{shard:02d}", name)
+
+def split_files(flights_file, passengers_file, bookings_file, shard_dir, shards, journal_file=None):
+    # Load the source through BookingManager, so unfolded .delta changes, an interrupted save and any
+    # journal are applied, then write per-shard slices. The history is streamed, not held in memory.
+    source = BookingManager(flights_file, passengers_file, bookings_file, journal_file=journal_file,
+                            bookings_history="lazy")
+    try:
+        write_shards(source, shard_dir, shards)
+    finally:
+        source.close()
+
+def write_shards(source, shard_dir, shards):
+    for shard in range(shards):
+        os.makedirs(os.path.dirname(shard_path(shard_dir, shard, "flights.csv")), exist_ok=True)
+
+    def open_writers(name, header):
+        files = [open(shard_path(shard_dir, shard, name), mode='w', newline='') for shard in range(shards)]
+        writers = [csv.writer(f) for f in files]
+        for writer in writers:
+            writer.writerow(header)
+        return files, writers
+
+    files, writers = open_writers("flights.csv", FLIGHT_HEADER)
+    shard_flights = {}
+    for flight in source.flights.values():
+        shard = shard_flights[flight.flight_id] = shard_of(flight.flight_id, shards)
+        writers[shard].writerow(flight.to_csv_format())
+    for f in files:
+        f.close()
+
+    files, writers = open_writers("passengers.csv", PASSENGER_HEADER)
+    with open(os.path.join(shard_dir, "passengers.csv"), mode='w', newline='') as directory, \
+            open(os.path.join(shard_dir, "booking_order.csv"), mode='w', newline='') as order:
+        directory_writer = csv.writer(directory)
+        directory_writer.writerow(PASSENGER_HEADER)
+        order_writer = csv.writer(order)
+        for passenger in source.passengers.values():
+            row = passenger.to_csv_format()
+            directory_writer.writerow([row[0], row[1], row[2], ""])
+            by_shard = {}
+            for flight_id in passenger.booked_flights:
+                if flight_id in shard_flights:
+                    by_shard.setdefault(shard_flights[flight_id], []).append(flight_id)
+                    order_writer.writerow([row[0], flight_id])
+            for shard, flight_ids in by_shard.items():
+                writers[shard].writerow([row[0], row[1], row[2], ",".join(flight_ids)])
+    for f in files:
+        f.close()
+
+    files, writers = open_writers("bookings.csv", ["Transaction Type", "Flight ID", "Passenger ID", "Date"])
+    for row in source.iter_bookings():
+        if len(row) == 4 and row[1] in shard_flights:
+            writers[shard_flights[row[1]]].writerow(row)
+    for f in files:
+        f.close()
+
+    with open(os.path.join(shard_dir, "shards.csv"), mode='w', newline='') as f:
+        csv.writer(f).writerows([["Shards"], [shards]])
+
+class ShardHandler:
+    # Runs inside a shard process; every method answers one coordinator request
+    def __init__(self, manager):
+        self.manager = manager
+        self.lock = threading.Lock()
+
+    def ensure_passenger(self, passenger_row):
+        # A passenger gets a record on a shard the first time they book one of its flights
+        if passenger_row[0] not in self.manager.passengers:
+            with self.lock:
+                if passenger_row[0] not in self.manager.passengers:
+                    self.manager.add_passenger(Passenger(passenger_row[0], passenger_row[1], passenger_row[2]))
+
+    def book_flight(self, flight_id, passenger_row):
+        if flight_id in self.manager.flights:
+            self.ensure_passenger(passenger_row)
+        return self.manager.book_flight(flight_id, passenger_row[0])
+
+    def cancel_booking(self, flight_id, passenger_id):
+        if flight_id in self.manager.flights and passenger_id not in self.manager.passengers:
+            return "Cancellation failed: Booking not found."
+        return self.manager.cancel_booking(flight_id, passenger_id)
+
+    def book_many(self, pairs, passenger_rows, all_or_nothing):
+        for flight_id, passenger_id in pairs:
+            if flight_id in self.manager.flights:
+                self.ensure_passenger(passenger_rows[passenger_id])
+        return self.manager.book_many(pairs, all_or_nothing)
+
+    def cancel_many(self, pairs, all_or_nothing):
+        return self.manager.cancel_many(pairs, all_or_nothing)
+
+    def passenger_flights(self, passenger_ids):
+        return {passenger_id: list(self.manager.passengers[passenger_id].booked_flights)
+                for passenger_id in passenger_ids if passenger_id in self.manager.passengers}
+
+    def add_flight(self, row):
+        return self.manager.add_flight(Flight(*row))
+
+    def search_flight(self, query):
+        return self.manager.search_flight(query)
+
+    def view_schedule(self):
+        return self.manager.view_schedule()
+
+    def find_flights(self, *args):
+        return self.manager.find_flights(*args)
+
+    def next_departures(self, *args):
+        return self.manager.next_departures(*args)
+
+    def get_manifest(self, flight_id):
+        return self.manager.get_manifest(flight_id)
+
+def run_shard(shard_dir, shard, connection, options, threads):
+    manager = BookingManager(shard_path(shard_dir, shard, "flights.csv"), shard_path(shard_dir, shard, "passengers.csv"),
+                             shard_path(shard_dir, shard, "bookings.csv"),
+                             journal_file=shard_path(shard_dir, shard, "journal.csv"), **options)
+    manager.update_log_file = shard_path(shard_dir, shard, "updateLog.csv")
+    handler = ShardHandler(manager)
+    send_lock = threading.Lock()
+
+    def answer(request_id, method, args):
+        try:
+            reply = (request_id, getattr(handler, method)(*args), None)
+        except Exception as error:
+            reply = (request_id, None, error)
+        with send_lock:
+            connection.send(reply)
+
+    # A few threads per shard so a booking waiting on fsync or a group commit does not stall the rest
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            executor.submit(answer, *message)
+    manager.close()
+    connection.close()
+
+class ShardClient:
+    # The coordinator's end of one shard: requests are pipelined and matched to replies by ID
+    def __init__(self, shard_dir, shard, options, threads):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=run_shard, args=(shard_dir, shard, child, options, threads),
+                                               name=f"booking-shard-{shard}", daemon=True)
+        self.process.start()
+        child.close()
+        self.send_lock = threading.Lock()
+        self.pending = {}
+        self.ids = itertools.count()
+        self.reader = None
+
+    def start_reader(self):
+        # Started only after every shard process exists, so no process is forked with this thread running
+        self.reader = threading.Thread(target=self.read_replies, daemon=True)
+        self.reader.start()
+
+    def read_replies(self):
+        while True:
+            try:
+                request_id, result, error = self.connection.recv()
+            except (EOFError, OSError):
+                break
+            future = self.pending.pop(request_id)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        for future in list(self.pending.values()):
+            future.set_exception(RuntimeError("Shard process exited."))
+
+    def submit(self, method, *args):
+        future = Future()
+        with self.send_lock:
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+            self.connection.send((request_id, method, args))
+        return future
+
+    def call(self, method, *args):
+        return self.submit(method, *args).result()
+
+    def close(self):
+        with self.send_lock:
+            self.connection.send(None)
+        self.process.join()
+        self.connection.close()
+
+class ShardedBookingManager:
+    # Same calls as BookingManager, served by one process per shard of the flights. Bookings on
+    # different shards run truly in parallel; each shard persists through its own journal.
+    def __init__(self, flights_file, passengers_file, bookings_file, shard_dir="shards", shards=None,
+                 shard_threads=4, journal_file=None, **options):
+        # journal_file is the source files' journal, replayed before they are split; each shard has its own
+        shards = shards or os.cpu_count() or 1
+        count_file = os.path.join(shard_dir, "shards.csv")
+        if os.path.exists(count_file):
+            with open(count_file, mode='r', newline='') as f:
+                existing = int(list(csv.reader(f))[1][0])
+            if existing != shards:
+                raise ValueError(f"{shard_dir} is split into {existing} shards, not {shards}.")
+        else:
+            split_files(flights_file, passengers_file, bookings_file, shard_dir, shards, journal_file)
+        self.shard_dir = shard_dir
+        self.shards = shards
+
+        # The coordinator owns names and contacts; shards only hold the passengers booked on them
+        self.passengers_file = os.path.join(shard_dir, "passengers.csv")
+        self.passengers = {}
+        self.passenger_index = NGramIndex()
+        with open(self.passengers_file, mode='r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                self.passengers[row[0]] = row[:3]
+                self.passenger_index.add(row[0], row[0] + row[1] + row[2])
+        self.passenger_lock = threading.Lock()
+
+        # (passenger ID, flight ID) -> position of its latest booking. Only orders the flight lists, so it
+        # is flushed but not fsynced; flights missing after a crash are listed last in shard order.
+        self.order_file = os.path.join(shard_dir, "booking_order.csv")
+        self.booked_at = {}
+        if os.path.exists(self.order_file):
+            with open(self.order_file, mode='r', newline='') as f:
+                for position, row in enumerate(csv.reader(f)):
+                    if len(row) == 2:
+                        self.booked_at[(row[0], row[1])] = position
+        self.order_lock = threading.Lock()
+        self.order_log = open(self.order_file, mode='a', newline='')
+        self.order_writer = csv.writer(self.order_log)
+        self.next_position = len(self.booked_at) and max(self.booked_at.values()) + 1
+
+        self.clients = [ShardClient(shard_dir, shard, options, shard_threads) for shard in range(shards)]
+        for client in self.clients:
+            client.start_reader()
+
+    def client(self, flight_id):
+        return self.clients[shard_of(flight_id, self.shards)]
+
+    def fan_out(self, method, *args):
+        futures = [client.submit(method, *args) for client in self.clients]
+        return [future.result() for future in futures]
+
+    def book_flight(self, flight_id, passenger_id):
+        passenger = self.passengers.get(passenger_id)
+        if passenger is None:
+            return "Booking failed: Flight or passenger not found."
+        message = self.client(flight_id).call("book_flight", flight_id, passenger)
+        if message.startswith("Flight "):
+            self.record_order([(flight_id, passenger_id)])
+        return message
+
+    def record_order(self, pairs):
+        with self.order_lock:
+            for flight_id, passenger_id in pairs:
+                self.order_writer.writerow([passenger_id, flight_id])
+                self.booked_at[(passenger_id, flight_id)] = self.next_position
+                self.next_position += 1
+            self.order_log.flush()
+
+    def cancel_booking(self, flight_id, passenger_id):
+        if passenger_id not in self.passengers:
+            return "Cancellation failed: Flight or passenger not found."
+        return self.client(flight_id).call("cancel_booking", flight_id, passenger_id)
+
+    def book_many(self, pairs, all_or_nothing=True):
+        # An all-or-nothing batch spanning shards is booked on each shard and, if any shard rejects its
+        # part, cancelled again on the others. Until then the other shards' seats show as taken.
+        pairs = list(pairs)
+        messages, by_shard = self.run_many("book_many", pairs, all_or_nothing,
+                                           "Booking failed: Flight or passenger not found.",
+                                           "Booking not made: another booking in the batch failed.")
+        booked = [position for positions in by_shard.values() for position in positions
+                  if messages[position].startswith("Flight ")]
+        if all_or_nothing and len(booked) < len(pairs):
+            rollback = [pairs[position] for position in booked]
+            if rollback:
+                self.cancel_many_unchecked(rollback)
+            return [message if message.startswith("Booking failed") else
+                    "Booking not made: another booking in the batch failed." for message in messages]
+        self.record_order([pairs[position] for position in sorted(booked)])
+        return messages
+
+    def cancel_many(self, pairs, all_or_nothing=True):
+        # A cancelled seat can be taken at once, so a failed batch could not be undone on other shards
+        pairs = list(pairs)
+        if all_or_nothing and len({shard_of(flight_id, self.shards) for flight_id, _ in pairs}) > 1:
+            raise ValueError("An all-or-nothing cancellation must stay within one shard; "
+                             "pass all_or_nothing=False or split the batch.")
+        return self.run_many("cancel_many", pairs, all_or_nothing,
+                             "Cancellation failed: Flight or passenger not found.",
+                             "Cancellation not made: another cancellation in the batch failed.")[0]
+
+    def cancel_many_unchecked(self, pairs):
+        by_shard = {}
+        for pair in pairs:
+            by_shard.setdefault(shard_of(pair[0], self.shards), []).append(pair)
+        futures = [self.clients[shard].submit("cancel_many", shard_pairs, False)
+                   for shard, shard_pairs in by_shard.items()]
+        for future in futures:
+            future.result()
+
+    def run_many(self, method, pairs, all_or_nothing, missing_message, not_made_message):
+        pairs = list(pairs)
+        messages = [missing_message] * len(pairs)
+        by_shard = {}
+        for position, (flight_id, passenger_id) in enumerate(pairs):
+            if passenger_id in self.passengers:
+                by_shard.setdefault(shard_of(flight_id, self.shards), []).append(position)
+        if all_or_nothing and sum(len(positions) for positions in by_shard.values()) < len(pairs):
+            # As in BookingManager, pairs with a known passenger were held back by the others
+            for positions in by_shard.values():
+                for position in positions:
+                    messages[position] = not_made_message
+            return messages, {}
+        futures = {}
+        for shard, positions in by_shard.items():
+            shard_pairs = [pairs[position] for position in positions]
+            if method == "book_many":
+                rows = {passenger_id: self.passengers[passenger_id] for _, passenger_id in shard_pairs}
+                futures[shard] = self.clients[shard].submit(method, shard_pairs, rows, all_or_nothing)
+            else:
+                futures[shard] = self.clients[shard].submit(method, shard_pairs, all_or_nothing)
+        for shard, future in futures.items():
+            for position, message in zip(by_shard[shard], future.result()):
+                messages[position] = message
+        return messages, by_shard
+
+    def add_flight(self, flight):
+        return self.client(flight.flight_id).call("add_flight", flight.to_csv_format())
+
+    def add_passenger(self, passenger):
+        with self.passenger_lock:
+            with open(self.passengers_file, mode='a', newline='') as f:
+                csv.writer(f).writerow([passenger.passenger_id, passenger.name, passenger.contact_details, ""])
+                f.flush()
+                os.fsync(f.fileno())
+            self.passengers[passenger.passenger_id] = [passenger.passenger_id, passenger.name,
+                                                       passenger.contact_details]
+            self.passenger_index.add(passenger.passenger_id, passenger.search_text())
+        return f"Passenger {passenger.passenger_id} added."
+
+    def search_flight(self, query):
+        return sorted((row for rows in self.fan_out("search_flight", query) for row in rows), key=lambda row: row[0])
+
+    def search_passenger(self, query):
+        passenger_ids = self.passenger_index.search(query)
+        booked = {}
+        for flights in self.fan_out("passenger_flights", passenger_ids):
+            for passenger_id, flight_ids in flights.items():
+                booked.setdefault(passenger_id, []).extend(flight_ids)
+        # Each shard keeps its own flights in booking order; the order log interleaves them
+        last = self.next_position
+        for passenger_id, flight_ids in booked.items():
+            flight_ids.sort(key=lambda flight_id: self.booked_at.get((passenger_id, flight_id), last))
+        return [self.passengers[passenger_id] + [",".join(booked.get(passenger_id, ()))]
+                for passenger_id in passenger_ids]
+
+    def view_schedule(self):
+        return list(heapq.merge(*self.fan_out("view_schedule"), key=schedule_order))
+
+    def find_flights(self, departure=None, arrival=None, start_date=None, end_date=None, min_seats=0):
+        return list(heapq.merge(*self.fan_out("find_flights", departure, arrival, start_date, end_date, min_seats),
+                                key=schedule_order))
+
+    def next_departures(self, after, count=10, departure=None, arrival=None):
+        merged = heapq.merge(*self.fan_out("next_departures", parse_moment(after), count, departure, arrival),
+                             key=schedule_order)
+        return list(itertools.islice(merged, count))
+
+    def get_manifest(self, flight_id):
+        return self.client(flight_id).call("get_manifest", flight_id)
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        self.order_log.close()
+
+def schedule_order(row):
+    return (departure_timestamp(row[3], row[4]), row[0])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split the CSVs into per-shard directories for ShardedBookingManager.")
+    parser.add_argument("--shard-dir", default="shards")
+    parser.add_argument("--shards", type=int, default=os.cpu_count())
+    parser.add_argument("--journal-file", help="journal of the source files, replayed before splitting")
+    args = parser.parse_args()
+    split_files("flights.csv", "passengers.csv", "bookings.csv", args.shard_dir, args.shards, args.journal_file)
@@ -0,0 +1,165 @@
+import argparse
+import csv
+import mmap
+import os
+import struct
+import threading
+from collections.abc import MutableMapping
+
+# Layout: header | string table | flight records | passenger records.
+# Strings are stored once each as a u32 length plus UTF-8 bytes; records hold u64 offsets into the table.
+MAGIC = b"FBSNAP01"
+HEADER = struct.Struct("<8sIIQQ")
+FLIGHT = struct.Struct("<5Qi")
+PASSENGER = struct.Struct("<4Q")
+LENGTH = struct.Struct("<I")
+
+def write_snapshot(path, flight_rows, passenger_rows):
+    # flight_rows / passenger_rows are to_csv_format() lists
+    strings = bytearray()
+    offsets = {}
+
+    def ref(value):
+        offset = offsets.get(value)
+        if offset is None:
+            data = value.encode()
+            offset = offsets[value] = HEADER.size + len(strings)
+            strings.extend(LENGTH.pack(len(data)))
+            strings.extend(data)
+        return offset
+
+    flights = bytearray()
+    for row in flight_rows:
+        flights.extend(FLIGHT.pack(ref(row[0]), ref(row[1]), ref(row[2]), ref(row[3]), ref(row[4]), int(row[5])))
+    passengers = bytearray()
+    for row in passenger_rows:
+        passengers.extend(PASSENGER.pack(ref(row[0]), ref(row[1]), ref(row[2]), ref(row[3])))
+
+    flights_offset = HEADER.size + len(strings)
+    passengers_offset = flights_offset + len(flights)
+    temp_path = path + ".tmp"
+    with open(temp_path, mode='wb') as f:
+        f.write(HEADER.pack(MAGIC, len(flights) // FLIGHT.size, len(passengers) // PASSENGER.size,
+                            flights_offset, passengers_offset))
+        f.write(strings)
+        f.write(flights)
+        f.write(passengers)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class Snapshot:
+    def __init__(self, path):
+        self.file = open(path, mode='rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.flight_count, self.passenger_count, self.flights_offset, self.passengers_offset = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a flight booking snapshot.")
+
+    def string(self, offset):
+        length = LENGTH.unpack_from(self.data, offset)[0]
+        start = offset + LENGTH.size
+        return self.data[start:start + length].decode()
+
+    def flight_row(self, slot):
+        fields = FLIGHT.unpack_from(self.data, self.flights_offset + slot * FLIGHT.size)
+        return [self.string(offset) for offset in fields[:5]] + [fields[5]]
+
+    def passenger_row(self, slot):
+        fields = PASSENGER.unpack_from(self.data, self.passengers_offset + slot * PASSENGER.size)
+        return [self.string(offset) for offset in fields]
+
+    def flight_id(self, slot):
+        return self.string(FLIGHT.unpack_from(self.data, self.flights_offset + slot * FLIGHT.size)[0])
+
+    def passenger_id(self, slot):
+        return self.string(PASSENGER.unpack_from(self.data, self.passengers_offset + slot * PASSENGER.size)[0])
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+class LazyRecords(MutableMapping):
+    # A dict of records whose values are decoded from the snapshot the first time they are read
+    def __init__(self, count, key_at, decode):
+        self.decode = decode
+        self.lock = threading.Lock()
+        # key -> slot number until decoded, then key -> record; file order is kept
+        self.entries = {key_at(slot): slot for slot in range(count)}
+
+    def __getitem__(self, key):
+        value = self.entries[key]
+        if type(value) is int:
+            with self.lock:
+                value = self.entries[key]
+                if type(value) is int:
+                    value = self.entries[key] = self.decode(value)
+        return value
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+
+    def __delitem__(self, key):
+        del self.entries[key]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+def read_csv_rows(path):
+    with open(path, mode='r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+def read_merged_rows(path):
+    # The CSV with its .delta sidecar of unfolded changes applied; a later row for an ID replaces
+    # the earlier one and keeps its place
+    rows = {}
+    for source in (path, path + ".delta"):
+        if os.path.exists(source):
+            for row in read_csv_rows(source):
+                rows[row[0]] = row
+    return rows.values()
+
+def csv_to_snapshot(flights_file, passengers_file, snapshot_file):
+    write_snapshot(snapshot_file, read_merged_rows(flights_file), read_merged_rows(passengers_file))
+
+def snapshot_to_csv(snapshot_file, flights_file, passengers_file):
+    snapshot = Snapshot(snapshot_file)
+    try:
+        with open(flights_file, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available"])
+            writer.writerows(snapshot.flight_row(slot) for slot in range(snapshot.flight_count))
+        with open(passengers_file, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Passenger ID", "Name", "Contact Details", "Booked Flights"])
+            writer.writerows(snapshot.passenger_row(slot) for slot in range(snapshot.passenger_count))
+    finally:
+        snapshot.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert between the CSV files and a binary snapshot.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_snapshot = commands.add_parser("to-snapshot")
+    to_snapshot.add_argument("flights_file")
+    to_snapshot.add_argument("passengers_file")
+    to_snapshot.add_argument("snapshot_file")
+    to_csv = commands.add_parser("to-csv")
+    to_csv.add_argument("snapshot_file")
+    to_csv.add_argument("flights_file")
+    to_csv.add_argument("passengers_file")
+    args = parser.parse_args()
+
+    if args.command == "to-snapshot":
+        csv_to_snapshot(args.flights_file, args.passengers_file, args.snapshot_file)
+    else:
+        snapshot_to_csv(args.snapshot_file, args.flights_file, args.passengers_file)
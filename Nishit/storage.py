@@ -0,0 +1,185 @@
+import sqlite3
+import threading
+
+# A storage backend provides:
+#   load(manager)                      fill manager.flights, manager.passengers and manager.bookings
+#   save_changes(manager, rows, flights, passengers)
+#                                      make booking rows durable together with the flight and passenger
+#                                      rows they changed, as captured when the rows were recorded
+#   save_flight(manager, flight)       persist a new or edited flight
+#   save_passenger(manager, passenger) persist a new or edited passenger
+#   iter_bookings(manager, ...)        stream saved booking rows, optionally filtered
+#   close()
+
+class CsvStorage:
+    # flights.csv, passengers.csv and bookings.csv, with the journal, snapshot and ledger options,
+    # implemented by BookingManager's own file methods
+    def load(self, manager):
+        manager.load_files()
+
+    def save_changes(self, manager, rows, flights, passengers):
+        manager.save_files(rows, flights, passengers)
+
+    def save_flight(self, manager, flight):
+        manager.save_flight_changes([flight.to_csv_format()])
+        manager.commit_files()
+
+    def save_passenger(self, manager, passenger):
+        manager.save_passenger_changes([passenger.to_csv_format()])
+        manager.commit_files()
+
+    def iter_bookings(self, manager, start_date=None, end_date=None, flight_id=None, passenger_id=None):
+        return manager.read_booking_files(start_date, end_date, flight_id, passenger_id)
+
+    def close(self):
+        pass
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS flights (flight_id TEXT PRIMARY KEY, departure TEXT, arrival TEXT,"
+    " date TEXT, time TEXT, seats_available INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS passengers (passenger_id TEXT PRIMARY KEY, name TEXT, contact_details TEXT)",
+    "CREATE TABLE IF NOT EXISTS passenger_flights (passenger_id TEXT, flight_id TEXT,"
+    " PRIMARY KEY (passenger_id, flight_id))",
+    "CREATE TABLE IF NOT EXISTS bookings (id INTEGER PRIMARY KEY, transaction_type TEXT, flight_id TEXT,"
+    " passenger_id TEXT, date TEXT)",
+    "CREATE INDEX IF NOT EXISTS flights_route ON flights (departure, arrival)",
+    "CREATE INDEX IF NOT EXISTS flights_date ON flights (date)",
+    "CREATE INDEX IF NOT EXISTS passenger_flights_flight ON passenger_flights (flight_id)",
+    "CREATE INDEX IF NOT EXISTS bookings_flight ON bookings (flight_id)",
+    "CREATE INDEX IF NOT EXISTS bookings_passenger ON bookings (passenger_id)",
+    "CREATE INDEX IF NOT EXISTS bookings_date ON bookings (date)",
+]
+
+# The sqlite3 module caches compiled statements, so reusing these strings reuses prepared statements
+UPSERT_FLIGHT = ("INSERT INTO flights VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (flight_id) DO UPDATE SET"
+                 " departure = excluded.departure, arrival = excluded.arrival, date = excluded.date,"
+                 " time = excluded.time, seats_available = excluded.seats_available")
+UPSERT_PASSENGER = ("INSERT INTO passengers VALUES (?, ?, ?) ON CONFLICT (passenger_id) DO UPDATE SET"
+                    " name = excluded.name, contact_details = excluded.contact_details")
+INSERT_BOOKED = "INSERT OR IGNORE INTO passenger_flights VALUES (?, ?)"
+DELETE_BOOKED = "DELETE FROM passenger_flights WHERE passenger_id = ? AND flight_id = ?"
+TAKE_SEAT = "UPDATE flights SET seats_available = seats_available - 1 WHERE flight_id = ?"
+FREE_SEAT = "UPDATE flights SET seats_available = seats_available + 1 WHERE flight_id = ?"
+INSERT_BOOKING = "INSERT INTO bookings (transaction_type, flight_id, passenger_id, date) VALUES (?, ?, ?, ?)"
+
+def seed_database(connection, flights, passengers, bookings):
+    # One transaction for the whole import. flights are CSV rows, passengers are (passenger ID, name,
+    # contact details, booked flight IDs) and bookings are [type, flight ID, passenger ID, date] rows.
+    # Shared with main.py so both front ends build the same database from the same files.
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.executemany(UPSERT_FLIGHT, flights)
+        for passenger_id, name, contact_details, booked_flights in passengers:
+            connection.execute(UPSERT_PASSENGER, (passenger_id, name, contact_details))
+            connection.executemany(INSERT_BOOKED, ((passenger_id, flight_id) for flight_id in booked_flights))
+        connection.executemany(INSERT_BOOKING, bookings)
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+class SqliteStorage:
+    def __init__(self, database_file):
+        self.database_file = database_file
+        # Writes are serialized by BookingManager.io_lock; reads open their own connections
+        self.connection = sqlite3.connect(database_file, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.lock = threading.Lock()
+
+    def load(self, manager):
+        from flight_booking_backend import Flight, Passenger
+
+        # An empty database is seeded from the manager's CSV files
+        if self.connection.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 0:
+            manager.load_files()
+            self.import_manager(manager)
+            return
+
+        for row in self.connection.execute("SELECT * FROM flights ORDER BY rowid"):
+            manager.flights[row[0]] = Flight(*row)
+        for row in self.connection.execute("SELECT * FROM passengers ORDER BY rowid"):
+            manager.passengers[row[0]] = Passenger(row[0], row[1], row[2])
+        for passenger_id, flight_id in self.connection.execute("SELECT * FROM passenger_flights ORDER BY rowid"):
+            manager.passengers[passenger_id].add_flight(flight_id)
+        if manager.bookings_history != "lazy":
+            for row in self.iter_bookings(manager):
+                manager.count_booking(row)
+                if manager.bookings_history == "full":
+                    manager.bookings.append(row)
+
+    def import_manager(self, manager):
+        with self.lock:
+            seed_database(self.connection, (flight.to_csv_format() for flight in manager.flights.values()),
+                          ((passenger.passenger_id, passenger.name, passenger.contact_details, passenger.booked_flights)
+                           for passenger in manager.passengers.values()),
+                          manager.read_booking_files())
+
+    def save_changes(self, manager, rows, flights, passengers):
+        # Seats, passenger bookings and the booking rows change together in one transaction. Each row
+        # is applied as an increment, so the captured flights and passengers are not needed.
+        end = len(manager.bookings)
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    if row[0] == "BOOK":
+                        self.connection.execute(TAKE_SEAT, (row[1],))
+                        self.connection.execute(INSERT_BOOKED, (row[2], row[1]))
+                    else:
+                        self.connection.execute(FREE_SEAT, (row[1],))
+                        self.connection.execute(DELETE_BOOKED, (row[2], row[1]))
+                    self.connection.execute(INSERT_BOOKING, row)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        manager.mark_bookings_saved(end)
+
+    def save_flight(self, manager, flight):
+        with self.lock:
+            self.connection.execute(UPSERT_FLIGHT, flight.to_csv_format())
+
+    def save_passenger(self, manager, passenger):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute(UPSERT_PASSENGER, passenger.to_csv_format()[:3])
+                self.connection.execute("DELETE FROM passenger_flights WHERE passenger_id = ?", (passenger.passenger_id,))
+                self.connection.executemany(INSERT_BOOKED, ((passenger.passenger_id, flight_id)
+                                                            for flight_id in passenger.booked_flights))
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def iter_bookings(self, manager, start_date=None, end_date=None, flight_id=None, passenger_id=None):
+        # WAL lets this read connection run alongside bookings being written
+        conditions, parameters = [], []
+        for clause, value in (("date >= ?", start_date), ("date <= ?", end_date),
+                              ("flight_id = ?", flight_id), ("passenger_id = ?", passenger_id)):
+            if value:
+                conditions.append(clause)
+                parameters.append(value)
+        query = "SELECT transaction_type, flight_id, passenger_id, date FROM bookings"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        connection = sqlite3.connect(self.database_file)
+        try:
+            for row in connection.execute(query + " ORDER BY id", parameters):
+                yield list(row)
+        finally:
+            connection.close()
+
+    def close(self):
+        self.connection.close()
+
+def create_storage(backend, database_file="bookings.db"):
+    # Used by the GUIs to pick a backend at start-up
+    if backend == "sqlite":
+        return SqliteStorage(database_file)
+    if backend == "csv":
+        return CsvStorage()
+    raise ValueError(f"Unknown storage backend {backend!r}.")
@@ -0,0 +1,216 @@
+import atexit
+import csv
+import glob
+import gzip
+import io
+import os
+import shutil
+import threading
+import time
+
+HEADER = ["Transaction Type", "Flight ID", "Passenger ID", "Timestamp"]
+DURABILITY = ("buffered", "flush", "fsync")
+
+class UpdateLog:
+    # Audit log of every booking and cancellation, kept open between writes.
+    # durability: "buffered" leaves rows in memory until the background flush every flush_interval
+    # seconds (a crash can lose that much), "flush" hands each write to the OS and "fsync" puts it on disk.
+    # The live file is rotated to path.YYYYmmdd-HHMMSS once it reaches max_bytes or is rotate_interval
+    # seconds old, and rotated segments are gzipped in the background when compress is set.
+    def __init__(self, path="updateLog.csv", durability="buffered", flush_interval=1.0, max_bytes=64 * 1024 * 1024,
+                 rotate_interval=None, compress=False, buffer_size=64 * 1024):
+        if durability not in DURABILITY:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY)}.")
+        self.path = path
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.lock = threading.Lock()
+        self.file = None
+        # Rows are formatted into this buffer and written as bytes, so sizes are known without tell()
+        self.text = io.StringIO()
+        self.writer = csv.writer(self.text)
+        self.size = 0
+        self.segment_rows = 0
+        self.opened_at = 0.0
+        self.dirty = False
+        # Bytes handed to write() since this object was created, including rows still buffered
+        self.bytes_written = 0
+        # Rotated segments still to be gzipped
+        self.to_compress = []
+        self.thread = None
+        self.stop = threading.Event()
+        self.closed = False
+        # The timestamp string is only re-formatted when the second changes
+        self.stamp_second = None
+        self.stamp = ""
+
+    def set_path(self, path):
+        with self.lock:
+            if path != self.path:
+                self.close_file()
+                self.path = path
+
+    def timestamp(self):
+        second = int(time.time())
+        if second != self.stamp_second:
+            self.stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self.stamp_second = second
+        return self.stamp
+
+    def write(self, rows):
+        # rows are [transaction type, flight ID, passenger ID, ...]; the timestamp is added here
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Update log is closed.")
+            if self.file is None:
+                self.open_file()
+            elif self.size >= self.max_bytes or self.segment_rows and self.segment_expired():
+                self.rotate()
+            timestamp = self.timestamp()
+            written = self.append([row[0], row[1], row[2], timestamp] for row in rows)
+            self.segment_rows += len(rows)
+            self.bytes_written += written
+            if self.durability == "buffered":
+                self.dirty = True
+            else:
+                self.file.flush()
+                if self.durability == "fsync":
+                    os.fsync(self.file.fileno())
+
+    def segment_expired(self):
+        return self.rotate_interval is not None and time.time() - self.opened_at >= self.rotate_interval
+
+    def append(self, rows):
+        self.text.seek(0)
+        self.text.truncate()
+        self.writer.writerows(rows)
+        data = self.text.getvalue().encode()
+        self.file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def open_file(self):
+        # Callers hold self.lock
+        self.file = open(self.path, mode='ab', buffering=self.buffer_size)
+        self.size = self.file.tell()
+        self.segment_rows = 0
+        self.opened_at = time.time()
+        if self.size == 0:
+            self.append([HEADER])
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="update-log", daemon=True)
+            self.thread.start()
+            # Buffered rows would otherwise be lost when the GUI exits without calling close()
+            atexit.register(self.close)
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+            self.dirty = False
+
+    def rotate(self):
+        # Callers hold self.lock
+        self.close_file()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        target = f"{self.path}.{stamp}"
+        suffix = 1
+        while os.path.exists(target) or os.path.exists(target + ".gz"):
+            target = f"{self.path}.{stamp}-{suffix}"
+            suffix += 1
+        os.replace(self.path, target)
+        if self.compress:
+            self.to_compress.append(target)
+        self.open_file()
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None and self.dirty:
+                self.file.flush()
+                self.dirty = False
+
+    def run(self):
+        while not self.stop.wait(self.flush_interval):
+            self.flush()
+            with self.lock:
+                if self.file is not None and self.segment_rows and self.segment_expired():
+                    self.rotate()
+            self.compress_rotated()
+
+    def compress_rotated(self):
+        while True:
+            with self.lock:
+                if not self.to_compress:
+                    return
+                path = self.to_compress.pop(0)
+            compress_file(path)
+
+    def read(self, passenger_id=None, flight_id=None, start=None, end=None):
+        # Buffered rows are flushed first so the reader sees everything written so far
+        self.flush()
+        return read_update_log(self.path, passenger_id, flight_id, start, end)
+
+    def close(self):
+        if self.thread is not None:
+            self.stop.set()
+            if self.thread is not threading.current_thread():
+                self.thread.join()
+            self.thread = None
+        with self.lock:
+            self.close_file()
+            self.closed = True
+        self.compress_rotated()
+
+def compress_file(path):
+    # Written to a temporary name first so a crash never leaves a truncated .gz next to the deleted segment
+    with open(path, mode='rb') as source, gzip.open(path + ".gz.tmp", mode='wb') as target:
+        shutil.copyfileobj(source, target)
+    os.replace(path + ".gz.tmp", path + ".gz")
+    os.remove(path)
+
+def segments(path):
+    # Rotated segments oldest first, then the live file, each with the time it was rotated (None if live)
+    found = []
+    for segment in glob.glob(glob.escape(path) + ".*"):
+        name = segment[len(path) + 1:]
+        if name.endswith(".gz"):
+            name = name[:-3]
+        elif os.path.exists(segment + ".gz"):
+            # Compressed just before a crash that kept the original from being removed
+            continue
+        stamp = name[:15]
+        if len(stamp) != 15 or not stamp.replace("-", "").isdigit() or not (name[16:] or "0").isdigit():
+            continue
+        rotated = f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:8]} {stamp[9:11]}:{stamp[11:13]}:{stamp[13:15]}"
+        found.append((rotated, int(name[16:] or 0), segment))
+    found.sort()
+    result = [(rotated, segment) for rotated, _, segment in found]
+    if os.path.exists(path):
+        result.append((None, path))
+    return result
+
+def read_update_log(path, passenger_id=None, flight_id=None, start=None, end=None):
+    # Stream [type, flight ID, passenger ID, timestamp] rows across every segment, oldest first.
+    # start and end are inclusive "YYYY-MM-DD[ HH:MM[:SS]]" prefixes; segments rotated before
+    # start are skipped unread, and lines without the wanted IDs are dropped before CSV parsing.
+    needles = [value for value in (passenger_id, flight_id) if value]
+    for rotated, segment in segments(path):
+        if start and rotated is not None and rotated < start:
+            continue
+        opener = gzip.open if segment.endswith(".gz") else open
+        with opener(segment, mode='rt', newline='') as f:
+            lines = (line for line in f if all(needle in line for needle in needles)) if needles else f
+            for row in csv.reader(lines):
+                if len(row) < 4 or row == HEADER:
+                    continue
+                if flight_id and row[1] != flight_id or passenger_id and row[2] != passenger_id:
+                    continue
+                if start and row[3] < start or end and row[3][:len(end)] > end:
+                    continue
+                yield row
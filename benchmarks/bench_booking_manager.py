@@ -0,0 +1,211 @@
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CITIES = ["Bangalore", "Delhi", "Chennai", "Mumbai", "Kolkata", "Hyderabad", "Goa", "Jaipur", "Mysore",
+          "Mangalore", "Manali", "Port Blair", "Colombo", "Karachi", "Beijing", "Kuala Lumpur", "Dubai",
+          "Singapore", "London", "Tokyo", "Pune", "Kochi", "Ahmedabad", "Lucknow", "Bhopal"]
+
+
+def flight_id(i):
+    return f"FL{i:07d}"
+
+
+def passenger_id(i):
+    return f"P{i:08d}"
+
+
+def generate(directory, flights, passengers, bookings, seed=0):
+    # Booking b is passenger b % passengers on flight (passenger + b // passengers) % flights, so each
+    # passenger's flights are distinct and every file can be streamed without holding rows in memory
+    rng = random.Random(seed)
+    per_passenger = -(-bookings // passengers) if passengers else 0
+    if per_passenger > flights:
+        raise SystemExit("More bookings per passenger than there are flights.")
+    booked = array("l", bytes(8 * flights)) if flights else array("l")
+    for b in range(bookings):
+        booked[(b % passengers + b // passengers) % flights] += 1
+    capacity = max(booked, default=0) + 100
+
+    with open(os.path.join(directory, "flights.csv"), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available"])
+        for i in range(flights):
+            departure, arrival = rng.sample(CITIES, 2)
+            day = 1 + i * 365 // max(flights, 1)
+            hour, minute = rng.randrange(1, 13), rng.choice((0, 15, 30, 45))
+            date = time.strftime("%Y-%m-%d", time.gmtime((20089 + day) * 86400))
+            writer.writerow([flight_id(i), departure, arrival, date,
+                             f"{hour:02d}:{minute:02d} {rng.choice(('AM', 'PM'))}", capacity - booked[i]])
+
+    with open(os.path.join(directory, "passengers.csv"), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Passenger ID", "Name", "Contact Details", "Booked Flights"])
+        for p in range(passengers):
+            count = bookings // passengers + (1 if p < bookings % passengers else 0)
+            flight_ids = ",".join(flight_id((p + j) % flights) for j in range(count))
+            writer.writerow([passenger_id(p), f"Passenger {p}", f"p{p}@example.com", flight_ids])
+
+    with open(os.path.join(directory, "bookings.csv"), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Transaction Type", "Flight ID", "Passenger ID", "Date"])
+        for b in range(bookings):
+            p = b % passengers
+            writer.writerow(["BOOK", flight_id((p + b // passengers) % flights), passenger_id(p), "2025-01-01"])
+
+
+def summarize(latencies):
+    # Latencies in seconds -> milliseconds percentiles plus operations per second
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {"runs": len(ordered), "p50_ms": round(percentile(0.50), 4), "p99_ms": round(percentile(0.99), 4),
+            "mean_ms": round(total / len(ordered) * 1000, 4),
+            "throughput_per_s": round(len(ordered) / total, 2) if total else None}
+
+
+def timed(results, name, action, calls):
+    latencies = []
+    for args in calls:
+        start = time.perf_counter()
+        action(*args)
+        latencies.append(time.perf_counter() - start)
+    if latencies:
+        results[name] = summarize(latencies)
+
+
+def peak_rss_kib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def load_main_module():
+    spec = importlib.util.spec_from_file_location("legacy_main", os.path.join(ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def open_target(target, directory):
+    files = [os.path.join(directory, name) for name in ("flights.csv", "passengers.csv", "bookings.csv")]
+    if target == "main":
+        return load_main_module().BookingManager(*files)
+    sys.path.insert(0, os.path.join(ROOT, "Nishit"))
+    from flight_booking_backend import BookingManager
+    manager = BookingManager(*files)
+    manager.update_log_file = os.path.join(directory, "updateLog.csv")
+    return manager
+
+
+def run_target(target, directory, args):
+    rng = random.Random(args.seed)
+    results = {}
+    timed(results, "load_data", lambda: open_target(target, directory), [()] * args.load_runs)
+    manager = open_target(target, directory)
+
+    flight_ids = [flight_id(rng.randrange(args.flights)) for _ in range(args.ops)]
+    passenger_ids = [passenger_id(rng.randrange(args.passengers)) for _ in range(args.ops)]
+    if target == "main":
+        # main.py has no text search, only lookups by ID
+        timed(results, "find_flight", manager.find_flight, [(i,) for i in flight_ids])
+        timed(results, "find_passenger", manager.find_passenger, [(i,) for i in passenger_ids])
+    else:
+        queries = [rng.choice((flight_ids[i], rng.choice(CITIES))) for i in range(args.ops)]
+        timed(results, "search_flight", manager.search_flight, [(q,) for q in queries])
+        timed(results, "search_passenger", manager.search_passenger, [(p,) for p in passenger_ids])
+
+    # Book pairs no passenger holds yet, then cancel the same pairs
+    pairs = dict.fromkeys(zip(flight_ids, passenger_ids))
+    timed(results, "book_flight", manager.book_flight, pairs)
+    timed(results, "cancel_booking", manager.cancel_booking, pairs)
+
+    if target == "main":
+        timed(results, "save_data", manager.save_data, [()] * args.save_runs)
+    else:
+        timed(results, "save_flights", manager.save_flights, [()] * args.save_runs)
+        timed(results, "save_passengers", manager.save_passengers, [()] * args.save_runs)
+        # Each run appends a batch of ops history rows, the amount one booking session produces
+        batch = [["BOOK", f, p, "2025-01-01"] for f, p in pairs][:args.ops]
+
+        def save_bookings():
+            manager.bookings.extend(batch)
+            manager.save_bookings()
+
+        timed(results, "save_bookings", save_bookings, [()] * args.save_runs)
+        manager.close()
+    results["peak_rss_kib"] = peak_rss_kib()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time BookingManager hot paths on synthetic data and print JSON.")
+    parser.add_argument("--flights", type=int, default=10 ** 3)
+    parser.add_argument("--passengers", type=int, default=10 ** 4)
+    parser.add_argument("--bookings", type=int, default=10 ** 4)
+    parser.add_argument("--ops", type=int, default=1000, help="searches, bookings and cancellations per target")
+    parser.add_argument("--load-runs", type=int, default=3)
+    parser.add_argument("--save-runs", type=int, default=5)
+    parser.add_argument("--targets", nargs="+", choices=["nishit", "main"], default=["nishit", "main"])
+    parser.add_argument("--data-dir", help="reuse or keep generated CSVs here instead of a temp directory")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process for one target, so peak RSS belongs to that implementation alone
+        json.dump(run_target(args.worker, os.getcwd(), args), sys.stdout)
+        return
+
+    report = {"flights": args.flights, "passengers": args.passengers, "bookings": args.bookings, "ops": args.ops,
+              "python": platform.python_version(), "platform": platform.platform(), "results": {}}
+    data_dir = args.data_dir or tempfile.mkdtemp()
+    try:
+        if not os.path.exists(os.path.join(data_dir, "flights.csv")):
+            os.makedirs(data_dir, exist_ok=True)
+            start = time.perf_counter()
+            generate(data_dir, args.flights, args.passengers, args.bookings, args.seed)
+            report["generate_s"] = round(time.perf_counter() - start, 3)
+        for target in args.targets:
+            # Every target starts from an untouched copy because the benchmark saves over the files
+            with tempfile.TemporaryDirectory() as work_dir:
+                for name in ("flights.csv", "passengers.csv", "bookings.csv"):
+                    shutil.copy(os.path.join(data_dir, name), work_dir)
+                command = [sys.executable, os.path.abspath(__file__), "--worker", target] + sys.argv[1:]
+                output = subprocess.run(command, cwd=work_dir, check=True, capture_output=True, text=True).stdout
+                report["results"][target] = json.loads(output.strip().splitlines()[-1])
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Nishit"))
+from bench_booking_manager import flight_id, generate, passenger_id
+from sharding import ShardedBookingManager
+
+
+def throughput(directory, shards, args):
+    manager = ShardedBookingManager(*(os.path.join(directory, name) for name in ("flights.csv", "passengers.csv",
+                                                                                "bookings.csv")),
+                                    shard_dir=os.path.join(directory, f"shards-{shards}"), shards=shards,
+                                    group_commit=args.group_commit)
+
+    def client(seed):
+        rng = random.Random(seed)
+        for _ in range(args.ops // args.clients):
+            pair = (flight_id(rng.randrange(args.flights)), passenger_id(rng.randrange(args.passengers)))
+            manager.book_flight(*pair)
+            manager.cancel_booking(*pair)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    manager.close()
+    return round(2 * (args.ops // args.clients) * args.clients / elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Book/cancel throughput of ShardedBookingManager by shard count.")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=4000)
+    parser.add_argument("--flights", type=int, default=10 ** 3)
+    parser.add_argument("--passengers", type=int, default=10 ** 4)
+    parser.add_argument("--group-commit", action="store_true")
+    args = parser.parse_args()
+
+    report = {"cpus": os.cpu_count(), "clients": args.clients, "ops": args.ops, "operations_per_s": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        generate(directory, args.flights, args.passengers, 0)
+        for shards in args.shards:
+            report["operations_per_s"][shards] = throughput(directory, shards, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Nishit"))
+from flight_booking_backend import Passenger
+
+
+class LegacyPassenger:
+    # The original layout: per-instance __dict__ and a fresh string per booked flight ID
+    def __init__(self, passenger_id, name, contact_details, booked_flights=None):
+        self.passenger_id = passenger_id
+        self.name = name
+        self.contact_details = contact_details
+        self.booked_flights = booked_flights if booked_flights else []
+
+
+def passenger_rows(count, flights, per_passenger):
+    for i in range(count):
+        booked = ",".join(f"FL{(i * 7 + j) % flights:05d}" for j in range(per_passenger))
+        yield [f"P{i:07d}", f"Passenger {i}", f"p{i}@example.com", booked]
+
+
+def measure(cls, count, flights, per_passenger):
+    gc.collect()
+    tracemalloc.start()
+    passengers = {}
+    for row in passenger_rows(count, flights, per_passenger):
+        booked_flights = row[3].split(',') if row[3] else []
+        passengers[row[0]] = cls(row[0], row[1], row[2], booked_flights)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del passengers
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Passenger memory use before and after __slots__/interning.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 5, 10 ** 6])
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--booked", type=int, default=3, help="booked flights per passenger")
+    args = parser.parse_args()
+
+    for count in args.sizes:
+        legacy = measure(LegacyPassenger, count, args.flights, args.booked)
+        compact = measure(Passenger, count, args.flights, args.booked)
+        print(f"{count:>9} passengers: legacy {legacy / 2 ** 20:8.1f} MiB, "
+              f"compact {compact / 2 ** 20:8.1f} MiB ({100 * (1 - compact / legacy):.0f}% smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Nishit"))
+from flight_booking_backend import BookingManager
+
+
+def write_data(directory, flights, seats, passengers):
+    with open(os.path.join(directory, "flights.csv"), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available"])
+        for i in range(flights):
+            writer.writerow([f"FL{i:04d}", "Bangalore", "Delhi", "2025-01-10", "10:00 AM", seats])
+    with open(os.path.join(directory, "passengers.csv"), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Passenger ID", "Name", "Contact Details", "Booked Flights"])
+        for i in range(passengers):
+            writer.writerow([f"P{i:05d}", f"Passenger {i}", f"p{i}@example.com", ""])
+    with open(os.path.join(directory, "bookings.csv"), mode='w', newline='') as f:
+        csv.writer(f).writerow(["Transaction Type", "Flight ID", "Passenger ID", "Date"])
+
+
+def open_manager(directory, **options):
+    return BookingManager(os.path.join(directory, "flights.csv"), os.path.join(directory, "passengers.csv"),
+                          os.path.join(directory, "bookings.csv"), journal_file=os.path.join(directory, "journal.csv"),
+                          **options)
+
+
+def check(manager, seats):
+    # Every seat taken must belong to exactly one passenger on that flight's manifest
+    for flight in manager.flights.values():
+        booked = [p for p in manager.passengers.values() if flight.flight_id in p.booked_flights]
+        assert flight.seats_available >= 0, f"{flight.flight_id} oversold: {flight.seats_available}"
+        assert flight.seats_available + len(booked) == seats, f"{flight.flight_id} seat count drifted"
+        assert sorted(manager.get_manifest(flight.flight_id)) == sorted(p.passenger_id for p in booked)
+
+
+def run(args, group_commit):
+    with tempfile.TemporaryDirectory() as directory:
+        write_data(directory, args.flights, args.seats, args.passengers)
+        manager = open_manager(directory, group_commit=group_commit, compact_threshold=args.operations // 3)
+        manager.update_log_file = os.path.join(directory, "updateLog.csv")
+
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(args.operations // args.threads):
+                flight_id = f"FL{rng.randrange(args.flights):04d}"
+                passenger_id = f"P{rng.randrange(args.passengers):05d}"
+                if rng.random() < 0.8:
+                    manager.book_flight(flight_id, passenger_id)
+                else:
+                    manager.cancel_booking(flight_id, passenger_id)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        check(manager, args.seats)
+        manager.close()
+
+        # The journal and snapshots on disk must replay to the same state
+        reloaded = open_manager(directory)
+        check(reloaded, args.seats)
+        for flight_id, flight in manager.flights.items():
+            assert reloaded.flights[flight_id].seats_available == flight.seats_available
+        reloaded.close()
+
+    mode = "group commit" if group_commit else "per-booking fsync"
+    print(f"{mode}: {args.operations} operations on {args.threads} threads in {elapsed:.2f}s, no overselling")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer BookingManager from many threads and check seat counts.")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--flights", type=int, default=20)
+    parser.add_argument("--seats", type=int, default=25)
+    parser.add_argument("--passengers", type=int, default=500)
+    args = parser.parse_args()
+    run(args, group_commit=False)
+    run(args, group_commit=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 from flight_booking_backend import BookingManager
+from result_view import FLIGHT_COLUMNS, PASSENGER_COLUMNS, BackgroundSearch, PagedResults
 
 class FlightBookingGUI:
     def __init__(self, root):
@@ -11,6 +12,10 @@ class FlightBookingGUI:
         # Initialize BookingManager with file paths
         self.manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv")
 
+        # Searches run off the UI thread; the flight search and the schedule share one so the newest wins
+        self.flight_searches = BackgroundSearch(self.root)
+        self.passenger_searches = BackgroundSearch(self.root)
+
         self.create_widgets()
 
     def create_widgets(self):
@@ -37,14 +42,15 @@ class FlightBookingGUI:
         tk.Label(search_frame, text="Search Flights:").pack(side=tk.LEFT, padx=5)
         self.flight_search_entry = tk.Entry(search_frame)
         self.flight_search_entry.pack(side=tk.LEFT, padx=5)
+        self.flight_search_entry.bind("<KeyRelease>", self.flight_query_changed)
         tk.Button(search_frame, text="Search", command=self.search_flights).pack(side=tk.LEFT, padx=5)
 
         # Schedule display button
         tk.Button(flight_tab, text="View Schedule", command=self.view_schedule).pack(pady=5)
 
         # Flight results area
-        self.flight_results = tk.Text(flight_tab, height=15, width=80)
-        self.flight_results.pack(pady=10)
+        self.flight_results = PagedResults(flight_tab, FLIGHT_COLUMNS)
+        self.flight_results.pack(pady=10, fill="both", expand=True)
 
     def create_passenger_tab(self):
         passenger_tab = ttk.Frame(self.notebook)
@@ -56,11 +62,12 @@ class FlightBookingGUI:
         tk.Label(search_frame, text="Search Passengers:").pack(side=tk.LEFT, padx=5)
         self.passenger_search_entry = tk.Entry(search_frame)
         self.passenger_search_entry.pack(side=tk.LEFT, padx=5)
+        self.passenger_search_entry.bind("<KeyRelease>", self.passenger_query_changed)
         tk.Button(search_frame, text="Search", command=self.search_passengers).pack(side=tk.LEFT, padx=5)
 
         # Passenger details area
-        self.passenger_details = tk.Text(passenger_tab, height=15, width=80)
-        self.passenger_details.pack(pady=10)
+        self.passenger_details = PagedResults(passenger_tab, PASSENGER_COLUMNS)
+        self.passenger_details.pack(pady=10, fill="both", expand=True)
 
     def create_booking_tab(self):
         booking_tab = ttk.Frame(self.notebook)
@@ -85,34 +92,31 @@ class FlightBookingGUI:
         self.booking_results = tk.Text(booking_tab, height=10, width=80)
         self.booking_results.pack(pady=10)
 
-    def search_flights(self):
+    def flight_search(self):
         query = self.flight_search_entry.get()
-        results = self.manager.search_flight(query)
-        self.flight_results.delete(1.0, tk.END)
-        if results:
-            for result in results:
-                self.flight_results.insert(tk.END, f"Flight ID: {result[0]}, Departure: {result[1]}, Arrival: {result[2]}, Date: {result[3]}, Time: {result[4]}, Seats Available: {result[5]}\n")
-        else:
-            self.flight_results.insert(tk.END, "No flights found matching the query.\n")
+        return (lambda: self.manager.search_flight(query),
+                lambda results: self.flight_results.show(results, "No flights found matching the query."))
+
+    def search_flights(self):
+        self.flight_searches.submit(*self.flight_search())
+
+    def flight_query_changed(self, event):
+        self.flight_searches.debounce(*self.flight_search())
 
     def view_schedule(self):
-        results = self.manager.view_schedule()
-        self.flight_results.delete(1.0, tk.END)
-        if results:
-            for result in results:
-                self.flight_results.insert(tk.END, f"Flight ID: {result[0]}, Departure: {result[1]}, Arrival: {result[2]}, Date: {result[3]}, Time: {result[4]}, Seats Available: {result[5]}\n")
-        else:
-            self.flight_results.insert(tk.END, "No flights available in the schedule.\n")
+        self.flight_searches.submit(self.manager.view_schedule,
+                                    lambda results: self.flight_results.show(results, "No flights available in the schedule."))
 
-    def search_passengers(self):
+    def passenger_search(self):
         query = self.passenger_search_entry.get()
-        results = self.manager.search_passenger(query)
-        self.passenger_details.delete(1.0, tk.END)
-        if results:
-            for result in results:
-                self.passenger_details.insert(tk.END, f"Passenger ID: {result[0]}, Name: {result[1]}, Contact: {result[2]}, Booked Flights: {result[3]}\n")
-        else:
-            self.passenger_details.insert(tk.END, "No passengers found matching the query.\n")
+        return (lambda: self.manager.search_passenger(query),
+                lambda results: self.passenger_details.show(results, "No passengers found matching the query."))
+
+    def search_passengers(self):
+        self.passenger_searches.submit(*self.passenger_search())
+
+    def passenger_query_changed(self, event):
+        self.passenger_searches.debounce(*self.passenger_search())
 
     def book_flight(self):
         flight_id = self.flight_id_entry.get()
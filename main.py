@@ -1,15 +1,25 @@
+import argparse
 import csv
+import os
+import sqlite3
+import sys
 from tkinter import *
 from tkinter import messagebox
 
+# The SQLite schema and seeding are shared with the Nishit backend so both build the same database
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Nishit"))
+from storage import SCHEMA, seed_database
+
 
 class Flight:
+    __slots__ = ("flight_id", "departure", "arrival", "date", "time", "seats_available")
+
     def __init__(self, flight_id, departure, arrival, date, time, seats_available):
-        self.flight_id = flight_id
-        self.departure = departure
-        self.arrival = arrival
-        self.date = date
-        self.time = time
+        self.flight_id = sys.intern(flight_id)
+        self.departure = sys.intern(departure)
+        self.arrival = sys.intern(arrival)
+        self.date = sys.intern(date)
+        self.time = sys.intern(time)
         self.seats_available = int(seats_available)
 
     def to_csv_row(self):
@@ -17,11 +27,14 @@ class Flight:
 
 
 class Passenger:
+    __slots__ = ("passenger_id", "name", "contact_details", "booked_flights")
+
     def __init__(self, passenger_id, name, contact_details, booked_flights):
         self.passenger_id = passenger_id
         self.name = name
         self.contact_details = contact_details
-        self.booked_flights = booked_flights  
+        # Ordered set: O(1) membership, add and remove while keeping CSV order
+        self.booked_flights = dict.fromkeys(sys.intern(flight_id) for flight_id in booked_flights if flight_id)
 
     def to_csv_row(self):
         return [self.passenger_id, self.name, self.contact_details, ",".join(self.booked_flights)]
@@ -29,56 +42,222 @@ class Passenger:
     def can_book(self, flight_id):
         return flight_id not in self.booked_flights
 
+    def add_flight(self, flight_id):
+        self.booked_flights[flight_id] = None
+
+    def remove_flight(self, flight_id):
+        self.booked_flights.pop(flight_id, None)
+
+
+def read_committed_rows(path, commit_file):
+    # Rows the Nishit backend appended to bookings.csv or a .delta sidecar, without the header.
+    # Bytes past the size its commit marker records belong to a save that never committed.
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    try:
+        with open(commit_file, "r", newline="") as file:
+            for row in csv.reader(file):
+                if len(row) == 3 and row[0] == "size" and row[1] == path:
+                    data = data[:int(row[2])]
+    except FileNotFoundError:
+        pass
+    return list(csv.reader(data.decode().splitlines()))[1:]
+
+
+def index_by_id(records, id_attribute, label):
+    # ID -> record in file order; a repeated ID would make lookups ambiguous, so it is rejected
+    indexed = {}
+    for record in records:
+        record_id = getattr(record, id_attribute)
+        if record_id in indexed:
+            raise ValueError(f"Duplicate {label} {record_id!r}.")
+        indexed[record_id] = record
+    return indexed
+
 
 class BookingManager:
-    def __init__(self, flights_file, passengers_file, bookings_file):
+    def __init__(self, flights_file, passengers_file, bookings_file, journal_file=None, compact_threshold=10000,
+                 database_file=None):
         self.flights_file = flights_file
         self.passengers_file = passengers_file
         self.bookings_file = bookings_file
-        self.flights = []
-        self.passengers = []
+        # With a journal each booking appends one record instead of calling save_data()
+        self.journal_file = journal_file
+        self.compact_threshold = compact_threshold
+        self.journal_count = 0
+        self.journal = None
+        # With a database every booking is one SQLite transaction instead of CSV writes
+        self.database_file = database_file
+        self.database = None
+        # ID -> record; dicts keep file order, so saving still writes rows in the order they were loaded
+        self.flights = {}
+        self.passengers = {}
+        # flight_id -> ordered set of passenger IDs booked on it
+        self.manifests = {}
 
         self.load_data()
 
     def load_data(self):
+        if self.database_file:
+            self.load_database()
+        else:
+            self.load_csv()
+
+        if self.journal_file and not self.database_file:
+            self.replay_journal()
+
+        self.manifests = {}
+        for passenger in self.passengers.values():
+            for flight_id in passenger.booked_flights:
+                self.manifests.setdefault(flight_id, {})[passenger.passenger_id] = None
+
+    def load_csv(self):
         
         with open(self.flights_file, "r") as file:
             reader = csv.reader(file)
             next(reader)  
-            self.flights = [Flight(*row) for row in reader]
+            self.flights = index_by_id((Flight(*row) for row in reader), "flight_id", "Flight ID")
 
         
         with open(self.passengers_file, "r") as file:
             reader = csv.reader(file)
             next(reader)
-            self.passengers = [Passenger(row[0], row[1], row[2], row[3].split(",")) for row in reader]
+            self.passengers = index_by_id((Passenger(row[0], row[1], row[2], row[3].split(",")) for row in reader),
+                                          "passenger_id", "Passenger ID")
+
+        # A later row for an ID replaces the earlier one and keeps its place
+        commit_file = self.bookings_file + ".commit"
+        for row in read_committed_rows(self.flights_file + ".delta", commit_file):
+            self.flights[row[0]] = Flight(*row)
+        for row in read_committed_rows(self.passengers_file + ".delta", commit_file):
+            self.passengers[row[0]] = Passenger(row[0], row[1], row[2], row[3].split(","))
+
+    def load_database(self):
+        self.database = sqlite3.connect(self.database_file, isolation_level=None)
+        self.database.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self.database.execute(statement)
+
+        # An empty database is seeded from the CSV files, booking history included
+        if self.database.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 0:
+            self.load_csv()
+            bookings = read_committed_rows(self.bookings_file, self.bookings_file + ".commit")
+            seed_database(self.database, (flight.to_csv_row() for flight in self.flights.values()),
+                          ((passenger.passenger_id, passenger.name, passenger.contact_details, passenger.booked_flights)
+                           for passenger in self.passengers.values()),
+                          (row for row in bookings if len(row) == 4))
+            return
+
+        self.flights = index_by_id((Flight(*row) for row in self.database.execute("SELECT * FROM flights ORDER BY rowid")),
+                                   "flight_id", "Flight ID")
+        self.passengers = index_by_id((Passenger(row[0], row[1], row[2], [])
+                                       for row in self.database.execute("SELECT * FROM passengers ORDER BY rowid")),
+                                      "passenger_id", "Passenger ID")
+        for passenger_id, flight_id in self.database.execute("SELECT * FROM passenger_flights ORDER BY rowid"):
+            self.passengers[passenger_id].add_flight(flight_id)
+
+    def save_to_database(self, transaction_type, flight_id, passenger_id):
+        # Seat count, passenger booking and booking row change together or not at all
+        seat_change = -1 if transaction_type == "BOOK" else 1
+        with self.database:
+            self.database.execute("BEGIN IMMEDIATE")
+            self.database.execute("UPDATE flights SET seats_available = seats_available + ? WHERE flight_id = ?",
+                                  (seat_change, flight_id))
+            if transaction_type == "BOOK":
+                self.database.execute("INSERT OR IGNORE INTO passenger_flights VALUES (?, ?)", (passenger_id, flight_id))
+            else:
+                self.database.execute("DELETE FROM passenger_flights WHERE passenger_id = ? AND flight_id = ?",
+                                      (passenger_id, flight_id))
+            self.database.execute("INSERT INTO bookings (transaction_type, flight_id, passenger_id, date) "
+                                  "VALUES (?, ?, ?, ?)",
+                                  (transaction_type, flight_id, passenger_id, self.find_flight(flight_id).date))
+
+    def replay_journal(self):
+        # Replay is idempotent so a crash between save_data() and the journal reset is harmless
+        self.journal_count = 0
+        try:
+            with open(self.journal_file, "r", newline="") as file:
+                for row in csv.reader(file):
+                    if len(row) != 3:
+                        continue
+                    self.journal_count += 1
+                    flight = self.find_flight(row[1])
+                    passenger = self.find_passenger(row[2])
+                    if not flight or not passenger:
+                        continue
+                    if row[0] == "BOOK" and passenger.can_book(flight.flight_id):
+                        flight.seats_available -= 1
+                        passenger.add_flight(flight.flight_id)
+                    elif row[0] == "CANCEL" and not passenger.can_book(flight.flight_id):
+                        flight.seats_available += 1
+                        passenger.remove_flight(flight.flight_id)
+        except FileNotFoundError:
+            pass
+
+    def save_change(self, transaction_type, flight_id, passenger_id):
+        if self.database:
+            self.save_to_database(transaction_type, flight_id, passenger_id)
+            return
+
+        if not self.journal_file:
+            self.save_data()
+            return
+
+        if self.journal is None:
+            self.journal = open(self.journal_file, "a", newline="")
+        csv.writer(self.journal).writerow([transaction_type, flight_id, passenger_id])
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.journal_count += 1
+        if self.journal_count >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        # Snapshot everything into the CSVs, then start an empty journal
+        self.save_data()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        with open(self.journal_file, "w") as file:
+            os.fsync(file.fileno())
+        self.journal_count = 0
 
     def save_data(self):
         
         with open(self.flights_file, "w", newline="") as file:
             writer = csv.writer(file)
             writer.writerow(["Flight ID", "Departure", "Arrival", "Date", "Time", "Seats Available"])
-            for flight in self.flights:
+            for flight in self.flights.values():
                 writer.writerow(flight.to_csv_row())
 
         
         with open(self.passengers_file, "w", newline="") as file:
             writer = csv.writer(file)
             writer.writerow(["Passenger ID", "Name", "Contact Details", "Booked Flights"])
-            for passenger in self.passengers:
+            for passenger in self.passengers.values():
                 writer.writerow(passenger.to_csv_row())
 
+        # The CSVs now hold every change, so the sidecars must not be applied again on the next load
+        for path in (self.flights_file + ".delta", self.passengers_file + ".delta"):
+            if os.path.exists(path):
+                os.remove(path)
+
     def find_flight(self, flight_id):
-        for flight in self.flights:
-            if flight.flight_id == flight_id:
-                return flight
-        return None
+        return self.flights.get(flight_id)
 
     def find_passenger(self, passenger_id):
-        for passenger in self.passengers:
-            if passenger.passenger_id == passenger_id:
-                return passenger
-        return None
+        return self.passengers.get(passenger_id)
+
+    def get_many(self, flight_ids=(), passenger_ids=()):
+        # Batch lookup: ([Flight or None, ...], [Passenger or None, ...]) in the order asked
+        return ([self.flights.get(flight_id) for flight_id in flight_ids],
+                [self.passengers.get(passenger_id) for passenger_id in passenger_ids])
+
+    def get_manifest(self, flight_id):
+        return list(self.manifests.get(flight_id, ()))
 
     def book_flight(self, flight_id, passenger_id):
         flight = self.find_flight(flight_id)
@@ -95,8 +274,9 @@ class BookingManager:
 
         
         flight.seats_available -= 1
-        passenger.booked_flights.append(flight_id)
-        self.save_data()
+        passenger.add_flight(flight_id)
+        self.manifests.setdefault(flight_id, {})[passenger_id] = None
+        self.save_change("BOOK", flight_id, passenger_id)
         return "Booking successful."
 
     def cancel_booking(self, flight_id, passenger_id):
@@ -111,8 +291,9 @@ class BookingManager:
 
         
         flight.seats_available += 1
-        passenger.booked_flights.remove(flight_id)
-        self.save_data()
+        passenger.remove_flight(flight_id)
+        self.manifests.get(flight_id, {}).pop(passenger_id, None)
+        self.save_change("CANCEL", flight_id, passenger_id)
         return "Booking canceled successfully."
 
 
@@ -144,5 +325,10 @@ class FlightBookingGUI:
 
 
 if __name__ == "__main__":
-    manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv")
+    parser = argparse.ArgumentParser(description="Flight Booking System")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    args = parser.parse_args()
+
+    database_file = "bookings.db" if args.backend == "sqlite" else None
+    manager = BookingManager("flights.csv", "passengers.csv", "bookings.csv", database_file=database_file)
     FlightBookingGUI(manager)